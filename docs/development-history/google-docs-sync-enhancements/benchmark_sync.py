@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the Google Docs sync script
+Runs sync_to_docs-backup.py against a local stand-in for the Docs/Drive APIs
+"""
+
+import argparse
+import collections
+import contextlib
+import datetime
+import glob
+import http
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.managers import BaseManager
+from urllib.parse import parse_qs, urlsplit
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_SCRIPT = os.path.join(SCRIPT_DIR, 'sync_to_docs-backup.py')
+TEMPLATE_DIR = os.path.join(SCRIPT_DIR, '..', '..', '..', '_project_scaffolding', '_template_library')
+DEFAULT_OUTPUT = 'benchmark_results.jsonl'
+
+SCENARIOS = ['initial', 'unchanged', 'edit', 'pull', 'pull-cached', 'directory']
+
+DOCUMENT_PATH = re.compile(r'/v1/documents/([^/:]+)')
+BATCH_UPDATE_PATH = re.compile(r'/v1/documents/([^/:]+):batchUpdate')
+DRIVE_FILE_PATH = re.compile(r'/drive/v3/files/([^/]+)')
+DRIVE_EXPORT_PATH = re.compile(r'/drive/v3/files/([^/]+)/export')
+DRIVE_FILES_PATH = '/drive/v3/files'
+DRIVE_START_TOKEN_PATH = '/drive/v3/changes/startPageToken'
+DRIVE_CHANGES_PATH = '/drive/v3/changes'
+DRIVE_ROOT_ID = 'root0000000000000000000000'
+DOC_MIME_TYPE = 'application/vnd.google-apps.document'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+QUERY_TERM = re.compile(r"(?:(name|mimeType) = '((?:[^'\\]|\\.)*)'|'((?:[^'\\]|\\.)*)' in parents)")
+BATCH_PATHS = ('/batch', '/batch/drive/v3')
+
+# What Google Docs' markdown export escapes, roughly
+EXPORT_ESCAPES = re.compile(r'^(#{1,6}|[-*+]|\d+\.)(?= )|(_)', re.MULTILINE)
+
+
+def load_sync_module():
+    """Import sync_to_docs-backup.py, whose file name is not a valid module name"""
+    spec = importlib.util.spec_from_file_location('sync_to_docs', SYNC_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def escape_like_export(text):
+    """Escape markdown the way a Google Docs markdown export does"""
+    return EXPORT_ESCAPES.sub(lambda m: '\\' + m.group(0), text)
+
+
+def utf16(text):
+    return text.encode('utf-16-le')
+
+
+def strip_bullet_tabs(buffer, start, end):
+    """Drop the leading tabs of the UTF-16 paragraphs overlapping [start, end), as bullets do"""
+    lines = []
+    offset = 0
+    for line in buffer.decode('utf-16-le').splitlines(keepends=True):
+        length = len(utf16(line)) // 2
+        if offset < end and offset + length > start:
+            line = line.lstrip('\t')
+        lines.append(line)
+        offset += length
+    return utf16(''.join(lines))
+
+
+class FakeGoogleAPI:
+    """
+    In-memory stand-in for the Docs v1 and Drive v3 calls the sync script makes
+
+    Supports documents.get, documents.batchUpdate (insertText,
+    deleteContentRange, and createParagraphBullets removing the leading
+    tabs of its paragraphs; formatting requests only have their range checked),
+    Drive files.get, files.export, files.create, files.list (name, mimeType
+    and parent queries), changes.getStartPageToken and changes.list, and
+    multipart HTTP batch requests.
+    Every HTTP request is delayed by latency +/- jitter seconds, fails with
+    a 503 with probability error_rate, and is answered with a 429 once the
+    per-minute read or write allowance is used up.
+    Every call is counted in `calls`, the refused ones as injected_errors
+    or rate_limited.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 reads_per_minute=None, writes_per_minute=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limits = {'read': reads_per_minute, 'write': writes_per_minute}
+        self.windows = {'read': collections.deque(), 'write': collections.deque()}
+        self.random = random.Random(seed)
+        self.docs = {}
+        self.files = {DRIVE_ROOT_ID: {'id': DRIVE_ROOT_ID, 'name': 'My Drive',
+                                      'mimeType': FOLDER_MIME_TYPE, 'parents': [], 'trashed': False}}
+        self.changes = []
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+
+    def add_document(self, doc_id, text=''):
+        with self.lock:
+            self.docs[doc_id] = [text + '\n', 1]
+
+    def add_file(self, name, mime_type, parent):
+        """Create a Drive file (a Google Doc or folder) and return its ID"""
+        prefix = 'folder' if mime_type == FOLDER_MIME_TYPE else 'created'
+        file_id = f"{prefix}{len(self.files):020d}"
+        self.files[file_id] = {'id': file_id, 'name': name, 'mimeType': mime_type,
+                               'parents': [parent], 'trashed': False}
+        if mime_type == DOC_MIME_TYPE:
+            self.docs[file_id] = ['\n', 1]
+        self.changes.append(file_id)
+        return file_id
+
+    def update_file(self, file_id, **fields):
+        """Change a Drive file (e.g. trashed=True or parents=[...]) as if edited in Drive"""
+        with self.lock:
+            self.files[file_id].update(fields)
+            self.changes.append(file_id)
+
+    def document_text(self, doc_id):
+        with self.lock:
+            return self.docs[doc_id][0]
+
+    def call_counts(self):
+        with self.lock:
+            return self.calls.copy()
+
+    def serve(self):
+        """Start answering HTTP requests on localhost; returns the root URL"""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without TCP_NODELAY
+            # Nagle holds the body until the client's delayed ACK (~40 ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, content_type, payload = api.dispatch(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = respond
+
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{httpd.server_address[1]}/"
+
+    # -- HTTP entry points -------------------------------------------------
+
+    def dispatch(self, method, target, headers, body):
+        """Handle one HTTP request; returns (status, content_type, payload)"""
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        url = urlsplit(target)
+        if method == 'POST' and url.path in BATCH_PATHS:
+            return self.batch(headers.get('Content-Type', ''), body)
+        return self.call(method, url.path, parse_qs(url.query), body)
+
+    def batch(self, content_type, body):
+        """Answer a multipart/mixed batch by handling each embedded request"""
+        with self.lock:
+            self.calls['batch'] += 1
+
+        message = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = f"batch_{self.random.getrandbits(64):x}"
+        parts = []
+
+        for part in message.get_payload():
+            raw = part.get_payload()
+            head, _, part_body = raw.replace('\r\n', '\n').partition('\n\n')
+            method, target = head.split('\n', 1)[0].split(' ')[:2]
+            url = urlsplit(target)
+            status, part_type, payload = self.call(
+                method, url.path, parse_qs(url.query), part_body.encode())
+
+            content_id = ' '.join(part['Content-ID'].split()).strip('<>')
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {part_type}\r\n\r\n"
+                f"{payload.decode('utf-8')}\r\n")
+
+        payload = ''.join(parts) + f"--{boundary}--\r\n"
+        return 200, f"multipart/mixed; boundary={boundary}", payload.encode('utf-8')
+
+    def call(self, method, path, query, body):
+        """Handle one API call (directly or inside a batch)"""
+        kind = 'write' if method == 'POST' else 'read'
+
+        with self.lock:
+            if self.random.random() < self.error_rate:
+                self.calls['injected_errors'] += 1
+                return self.error(503, 'Injected backend error')
+            if not self.allow(kind):
+                self.calls['rate_limited'] += 1
+                return self.error(429, 'Rate limit exceeded')
+
+            match = BATCH_UPDATE_PATH.fullmatch(path)
+            if match and method == 'POST':
+                self.calls['documents.batchUpdate'] += 1
+                return self.batch_update(match.group(1), json.loads(body or b'{}'))
+
+            match = DOCUMENT_PATH.fullmatch(path)
+            if match and method == 'GET':
+                self.calls['documents.get'] += 1
+                return self.get_document(match.group(1), 'fields' in query)
+
+            match = DRIVE_EXPORT_PATH.fullmatch(path)
+            if match and method == 'GET':
+                self.calls['drive.files.export'] += 1
+                return self.export(match.group(1))
+
+            match = DRIVE_FILE_PATH.fullmatch(path)
+            if match and method == 'GET':
+                self.calls['drive.files.get'] += 1
+                return self.file_metadata(match.group(1))
+
+            if path == DRIVE_FILES_PATH and method == 'POST':
+                self.calls['drive.files.create'] += 1
+                return self.create_file(json.loads(body or b'{}'))
+
+            if path == DRIVE_FILES_PATH and method == 'GET':
+                self.calls['drive.files.list'] += 1
+                return self.list_files(query)
+
+            if path == DRIVE_START_TOKEN_PATH and method == 'GET':
+                self.calls['drive.changes.getStartPageToken'] += 1
+                return self.ok({'startPageToken': str(len(self.changes))})
+
+            if path == DRIVE_CHANGES_PATH and method == 'GET':
+                self.calls['drive.changes.list'] += 1
+                return self.list_changes(query)
+
+        return self.error(404, f"No fake endpoint for {method} {path}")
+
+    def allow(self, kind):
+        """Sliding one-minute window per read/write quota"""
+        limit = self.limits[kind]
+        if not limit:
+            return True
+        window = self.windows[kind]
+        now = time.monotonic()
+        while window and now - window[0] > 60:
+            window.popleft()
+        if len(window) >= limit:
+            return False
+        window.append(now)
+        return True
+
+    # -- Endpoints (called with self.lock held) ----------------------------
+
+    def error(self, status, message):
+        payload = {'error': {'code': status, 'message': message, 'status': http.HTTPStatus(status).name}}
+        return status, 'application/json', json.dumps(payload).encode()
+
+    def ok(self, payload):
+        return 200, 'application/json', json.dumps(payload).encode()
+
+    def get_document(self, doc_id, partial):
+        if doc_id not in self.docs:
+            return self.error(404, f"Requested entity was not found: {doc_id}")
+        text, revision = self.docs[doc_id]
+
+        # One paragraph per line, as in a real plain-text document
+        content = [{'sectionBreak': {}, 'startIndex': 0, 'endIndex': 1}]
+        index = 1
+        for line in text.splitlines(keepends=True):
+            end = index + len(utf16(line)) // 2
+            content.append({
+                'startIndex': index,
+                'endIndex': end,
+                'paragraph': {'elements': [{'startIndex': index, 'endIndex': end, 'textRun': {'content': line}}]},
+            })
+            index = end
+
+        if partial:
+            content = [{'endIndex': content[0]['endIndex']}, {'endIndex': index}]
+        return self.ok({'documentId': doc_id, 'revisionId': str(revision), 'body': {'content': content}})
+
+    def batch_update(self, doc_id, body):
+        if doc_id not in self.docs:
+            return self.error(404, f"Requested entity was not found: {doc_id}")
+        text, revision = self.docs[doc_id]
+
+        required = body.get('writeControl', {}).get('requiredRevisionId')
+        if required and required != str(revision):
+            return self.error(400, 'The required revision ID does not match the latest revision')
+
+        buffer = utf16(text)
+        for request in body.get('requests', []):
+            if 'deleteContentRange' in request:
+                span = request['deleteContentRange']['range']
+                start, end = span['startIndex'] - 1, span['endIndex'] - 1
+                if not 0 <= start < end <= len(buffer) // 2 - 1:
+                    return self.error(400, f"Invalid deletion range {span}")
+                buffer = buffer[:2 * start] + buffer[2 * end:]
+            elif 'insertText' in request:
+                index = request['insertText']['location']['index'] - 1
+                if not 0 <= index <= len(buffer) // 2 - 1:
+                    return self.error(400, f"Invalid insertion index {index + 1}")
+                buffer = buffer[:2 * index] + utf16(request['insertText']['text']) + buffer[2 * index:]
+            else:
+                span = next(iter(request.values())).get('range')
+                if span and not 1 <= span['startIndex'] < span['endIndex'] <= len(buffer) // 2:
+                    return self.error(400, f"Invalid range {span}")
+                if 'createParagraphBullets' in request:
+                    buffer = strip_bullet_tabs(buffer, span['startIndex'] - 1, span['endIndex'] - 1)
+
+        self.docs[doc_id] = [buffer.decode('utf-16-le'), revision + 1]
+        return self.ok({
+            'documentId': doc_id,
+            'replies': [{} for _ in body.get('requests', [])],
+            'writeControl': {'requiredRevisionId': str(revision + 1)},
+        })
+
+    def file_metadata(self, doc_id):
+        if doc_id == 'root':
+            return self.ok({'id': DRIVE_ROOT_ID})
+        if doc_id not in self.docs:
+            return self.error(404, f"File not found: {doc_id}")
+        revision = self.docs[doc_id][1]
+        return self.ok({'id': doc_id, 'version': str(revision), 'modifiedTime': f"2024-01-01T00:00:{revision % 60:02d}Z"})
+
+    def export(self, doc_id):
+        if doc_id not in self.docs:
+            return self.error(404, f"File not found: {doc_id}")
+        return 200, 'text/markdown', escape_like_export(self.docs[doc_id][0]).encode('utf-8')
+
+    def create_file(self, body):
+        parents = [DRIVE_ROOT_ID if parent == 'root' else parent for parent in body.get('parents', ['root'])]
+        if parents[0] not in self.files:
+            return self.error(404, f"File not found: {parents[0]}")
+        return self.ok({'id': self.add_file(body['name'], body.get('mimeType'), parents[0])})
+
+    def list_files(self, query):
+        """files.list for queries ANDing name, mimeType (ORed) and parent terms"""
+        names, mime_types, parents = set(), set(), set()
+        for field, value, parent in QUERY_TERM.findall(query.get('q', [''])[0]):
+            value = re.sub(r'\\(.)', r'\1', value)
+            if parent:
+                parents.add(DRIVE_ROOT_ID if parent == 'root' else parent)
+            elif field == 'name':
+                names.add(value)
+            else:
+                mime_types.add(value)
+
+        found = [file for file in self.files.values()
+                 if not file['trashed'] and file['id'] != DRIVE_ROOT_ID
+                 and (not names or file['name'] in names)
+                 and (not mime_types or file['mimeType'] in mime_types)
+                 and (not parents or parents & set(file['parents']))]
+        start = int(query.get('pageToken', ['0'])[0])
+        size = int(query.get('pageSize', ['100'])[0])
+        response = {'files': found[start:start + size]}
+        if start + size < len(found):
+            response['nextPageToken'] = str(start + size)
+        return self.ok(response)
+
+    def list_changes(self, query):
+        start = int(query['pageToken'][0])
+        size = int(query.get('pageSize', ['100'])[0])
+        changes = [{'fileId': file_id, 'removed': False, 'file': self.files[file_id]}
+                   for file_id in self.changes[start:start + size]]
+        response = {'changes': changes}
+        if start + size < len(self.changes):
+            response['nextPageToken'] = str(start + size)
+        else:
+            response['newStartPageToken'] = str(len(self.changes))
+        return self.ok(response)
+
+
+class FakeGoogleManager(BaseManager):
+    """Hosts a FakeGoogleAPI in a separate process"""
+
+
+FakeGoogleManager.register('FakeGoogleAPI', FakeGoogleAPI,
+                           exposed=('add_document', 'add_file', 'update_file', 'document_text',
+                                    'call_counts', 'serve'))
+
+
+class FakeGoogleServer:
+    """
+    Serve a FakeGoogleAPI over HTTP on localhost, from its own process
+
+    The server's request handling would otherwise compete with the sync
+    script for the GIL and inflate the measured latencies. `api` is a proxy
+    for the FakeGoogleAPI in the server process, built with `options`.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.manager = FakeGoogleManager()
+        self.api = None
+        self.url = None
+
+    def __enter__(self):
+        self.manager.start()
+        self.api = self.manager.FakeGoogleAPI(**self.options)
+        self.url = self.api.serve()
+        return self
+
+    def __exit__(self, *exc):
+        self.manager.shutdown()
+
+    def build(self, api, version):
+        """Build a googleapiclient service pointed at this server"""
+        import httplib2
+        from googleapiclient import discovery_cache
+        from googleapiclient.discovery import build_from_document
+
+        document = json.loads(discovery_cache.get_static_doc(api, version))
+        document['rootUrl'] = document['mtlsRootUrl'] = self.url
+        return build_from_document(document, http=httplib2.Http())
+
+
+def make_offline_sync(module, server, **options):
+    """A GoogleDocsSync whose services talk to the fake server, without OAuth"""
+    module.load_google_libraries()
+    module.build = lambda api, version, credentials=None: server.build(api, version)
+
+    class OfflineSync(module.GoogleDocsSync):
+        def authenticate(self):
+            self.creds = None
+            self.service = module.build('docs', 'v1')
+
+    return OfflineSync(**options)
+
+
+def build_corpus(directory, api, files, scale, escaped=True):
+    """
+    Write `files` markdown files built from the template library
+
+    Each file is a template repeated `scale` times; with escaped, content
+    carries Google Docs export escapes so the cleaner has work to do.
+    Returns the config path.
+    """
+    templates = sorted(glob.glob(os.path.join(TEMPLATE_DIR, '*.md')))
+    if not templates:
+        raise SystemExit(f"❌ No templates found in {TEMPLATE_DIR}")
+
+    os.makedirs(os.path.join(directory, 'docs'), exist_ok=True)
+    config = {'_comment': 'Benchmark corpus generated from the template library'}
+
+    for i in range(files):
+        template = templates[i % len(templates)]
+        with open(template, 'r', encoding='utf-8') as f:
+            text = f.read()
+        text = f"# Benchmark copy {i}\n\n" + text * scale
+        if escaped:
+            text = escape_like_export(text)
+
+        name = os.path.splitext(os.path.basename(template))[0]
+        file_path = os.path.join(directory, 'docs', f"{i:03d}_{name}.md")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        doc_id = f"benchmark{i:020d}"
+        api.add_document(doc_id)
+        config[file_path] = doc_id
+
+    config_path = os.path.join(directory, 'sync_config.json')
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    return config_path
+
+
+def edit_corpus(config_path, round_number):
+    """Change one line in the middle of every mapped file"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    for file_path in config:
+        if file_path.startswith('_'):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        middle = len(lines) // 2
+        lines.insert(middle, f"Benchmark edit {round_number}\n")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+
+def build_directory(config_path):
+    """Copy the corpus into a nested directory with no doc IDs, for directory-mode provisioning"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    directory = os.path.join(os.path.dirname(config_path), 'directory')
+    files = []
+    for i, file_path in enumerate(path for path in config if not path.startswith('_')):
+        target = os.path.join(directory, f"tier{i % 3 + 1}", os.path.basename(file_path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(file_path, target)
+        files.append(target)
+    return directory, files
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile, or None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_scenario(name, sync, api, config_path, workers, render=False, verbose=False):
+    """Run one scenario and return its metrics"""
+    timings = []
+    timings_lock = threading.Lock()
+
+    def timed(method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with timings_lock:
+                    timings.append(time.perf_counter() - start)
+        return wrapper
+
+    sync.push_file = timed(type(sync).push_file.__get__(sync))
+    sync.pull_file = timed(type(sync).pull_file.__get__(sync))
+
+    if name == 'edit':
+        edit_corpus(config_path, 1)
+
+    if name == 'directory':
+        directory, files = build_directory(config_path)
+    else:
+        with open(config_path, 'r') as f:
+            files = [path for path in json.load(f) if not path.startswith('_')]
+    total_bytes = sum(os.path.getsize(path) for path in files)
+
+    calls_before = api.call_counts()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output:
+        if name.startswith('pull'):
+            success = sync.pull_all_files(config_path, workers=workers)
+        elif name == 'directory':
+            success = sync.sync_directory(directory, workers=workers, render=render)
+        else:
+            success = sync.sync_all_files(config_path, workers=workers, render=render)
+    seconds = time.perf_counter() - start
+
+    calls = api.call_counts() - calls_before
+    # Calls answered with 429/503 still cost a round trip and quota
+    api_calls = sum(calls.values())
+    errors = calls['injected_errors'] + calls['rate_limited']
+    p50, p95 = percentile(timings, 0.50), percentile(timings, 0.95)
+
+    return {
+        'scenario': name,
+        'workers': workers,
+        'success': success,
+        'files': len(files),
+        'bytes': total_bytes,
+        'seconds': round(seconds, 4),
+        'files_per_sec': round(len(files) / seconds, 2) if seconds else None,
+        'bytes_per_sec': round(total_bytes / seconds) if seconds else None,
+        'api_calls': api_calls,
+        'api_calls_per_file': round(api_calls / len(files), 2) if files else None,
+        'api_errors': errors,
+        'calls': dict(calls),
+        'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+        'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+    }
+
+
+def template_text():
+    """All templates of the template library, concatenated"""
+    text = ''
+    for template in sorted(glob.glob(os.path.join(TEMPLATE_DIR, '*.md'))):
+        with open(template, 'r', encoding='utf-8') as f:
+            text += f.read()
+    return text
+
+
+def benchmark_cleaner(module, sizes_mb):
+    """Time unescape_markdown on escaped template text of the given sizes"""
+    text = escape_like_export(template_text())
+
+    results = []
+    for size_mb in sizes_mb:
+        size = int(size_mb * 1024 * 1024)
+        content = (text * (size // len(text) + 1))[:size]
+        start = time.perf_counter()
+        module.unescape_markdown(content)
+        seconds = time.perf_counter() - start
+        results.append({'size_mb': size_mb, 'seconds': round(seconds, 4),
+                        'mb_per_sec': round(size_mb / seconds, 2) if seconds else None})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(record):
+    print(f"\n📊 Sync benchmark ({record['params']['files']} files, "
+          f"latency {record['params']['latency_ms']}ms, error rate {record['params']['error_rate']})")
+    print(f"{'scenario':<12} {'workers':>7} {'files/s':>9} {'KB/s':>10} {'calls/file':>10} "
+          f"{'errors':>7} {'p50 ms':>8} {'p95 ms':>8}  ok")
+    for row in record['scenarios']:
+        print(f"{row['scenario']:<12} {row['workers']:>7} {row['files_per_sec'] or 0:>9.1f} "
+              f"{(row['bytes_per_sec'] or 0) / 1024:>10.1f} {row['api_calls_per_file'] or 0:>10.2f} "
+              f"{row['api_errors']:>7} "
+              f"{row['p50_ms'] if row['p50_ms'] is not None else '-':>8} "
+              f"{row['p95_ms'] if row['p95_ms'] is not None else '-':>8}  {'✅' if row['success'] else '❌'}")
+
+    for row in record['clean']:
+        print(f"🧹 unescape_markdown {row['size_mb']} MB: {row['seconds']}s ({row['mb_per_sec']} MB/s)")
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Google Docs sync against a local fake API server')
+    parser.add_argument('--files', type=int, default=40, help='Number of documents in the corpus')
+    parser.add_argument('--scale', type=int, default=1, help='Template repetitions per document')
+    parser.add_argument('--workers', default='1,8', help='Comma-separated worker counts to compare')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Fake server latency per HTTP request')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Random latency variation')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 503')
+    parser.add_argument('--server-reads-per-minute', type=int, help='Fake server read quota (429 beyond it)')
+    parser.add_argument('--server-writes-per-minute', type=int, help='Fake server write quota (429 beyond it)')
+    parser.add_argument('--clean-sizes', default='1,10,50', help='Comma-separated MB sizes for the cleaner benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latency jitter and error injection')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON lines file results are appended to')
+    parser.add_argument('--render', action='store_true', help='Push with native Docs formatting')
+    parser.add_argument('--client-limits', action='store_true',
+                        help="Keep the sync script's default client-side rate limits")
+    parser.add_argument('--verbose', action='store_true', help='Show the sync output')
+
+    args = parser.parse_args()
+    scenarios = parse_list(args.scenarios, str)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    module = load_sync_module()
+    limits = {} if args.client_limits else {
+        'reads_per_minute': 10 ** 6, 'writes_per_minute': 10 ** 6, 'drive_requests_per_minute': 10 ** 6}
+
+    record = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'params': {
+            'files': args.files, 'scale': args.scale, 'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms, 'error_rate': args.error_rate,
+            'server_reads_per_minute': args.server_reads_per_minute,
+            'server_writes_per_minute': args.server_writes_per_minute, 'seed': args.seed,
+            'render': args.render, 'client_limits': args.client_limits,
+        },
+        'scenarios': [],
+        'clean': [],
+    }
+
+    for workers in parse_list(args.workers, int):
+        server = FakeGoogleServer(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                  error_rate=args.error_rate, reads_per_minute=args.server_reads_per_minute,
+                                  writes_per_minute=args.server_writes_per_minute, seed=args.seed)
+
+        with tempfile.TemporaryDirectory() as directory, server:
+            api = server.api
+            config_path = build_corpus(directory, api, args.files, args.scale)
+            # Client-side limiters are opened wide unless --client-limits asks
+            # for the script's defaults; the fake server enforces quotas
+            sync = make_offline_sync(module, server, **limits)
+
+            for name in scenarios:
+                print(f"⏱️  {name} with {workers} workers...")
+                record['scenarios'].append(run_scenario(name, sync, api, config_path, workers,
+                                                        args.render, args.verbose))
+
+    record['clean'] = benchmark_cleaner(module, parse_list(args.clean_sizes, float))
+
+    print_report(record)
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    print(f"\n💾 Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
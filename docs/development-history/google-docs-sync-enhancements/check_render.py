@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+List check for the markdown renderer
+Replays render_markdown's list requests the way Google Docs applies them and
+compares the numbering a reader would see with the numbers in the source
+"""
+
+import argparse
+import os
+import sys
+
+from benchmark_sync import SCRIPT_DIR, load_sync_module
+
+REPO_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
+MAX_REPORTED = 10
+
+
+def utf16_length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+class DocsLists:
+    """
+    The paragraphs of a Docs body and their bullets, for list requests only
+
+    insertText (without newlines), createParagraphBullets (leading tabs set
+    the nesting level and are removed) and deleteParagraphBullets change the
+    model; other requests only have their range checked.
+    """
+
+    def __init__(self, text):
+        self.paragraphs = [[line, None] for line in (text + '\n').splitlines(keepends=True)]
+        self.lists = 0
+
+    def spans(self, start, end):
+        """The paragraphs overlapping [start, end)"""
+        index = 1
+        for paragraph in self.paragraphs:
+            length = utf16_length(paragraph[0])
+            if index < end and index + length > start:
+                yield paragraph, index
+            index += length
+
+    def length(self):
+        return 1 + sum(utf16_length(text) for text, _ in self.paragraphs)
+
+    def apply(self, request):
+        (kind, body), = request.items()
+        if kind == 'insertText':
+            index = body['location']['index']
+            if '\n' in body['text'] or not 1 <= index < self.length():
+                raise ValueError(f"unexpected insertText {body}")
+            paragraph, start = next(self.spans(index, index + 1))
+            offset = len(paragraph[0].encode('utf-16-le')[:2 * (index - start)].decode('utf-16-le'))
+            paragraph[0] = paragraph[0][:offset] + body['text'] + paragraph[0][offset:]
+            return
+
+        span = body.get('range')
+        if span and not 1 <= span['startIndex'] < span['endIndex'] <= self.length():
+            raise ValueError(f"{kind} range {span} outside the body (length {self.length()})")
+        if kind == 'createParagraphBullets':
+            self.lists += 1
+            for paragraph, _ in list(self.spans(span['startIndex'], span['endIndex'])):
+                level = len(paragraph[0]) - len(paragraph[0].lstrip('\t'))
+                paragraph[0] = paragraph[0][level:]
+                paragraph[1] = (self.lists, level, body['bulletPreset'])
+        elif kind == 'deleteParagraphBullets':
+            for paragraph, _ in self.spans(span['startIndex'], span['endIndex']):
+                paragraph[1] = None
+
+    def numbers(self):
+        """Per paragraph: (preset, level, ordinal within its list and level), or None"""
+        counters = {}
+        shown = []
+        for _, bullet in self.paragraphs:
+            if bullet is None:
+                shown.append(None)
+                continue
+            list_id, level, preset = bullet
+            levels = counters.setdefault(list_id, [])
+            del levels[level + 1:]
+            levels.extend([0] * (level + 1 - len(levels)))
+            levels[level] += 1
+            shown.append((preset, level, levels[level]))
+        return shown
+
+
+def source_paragraphs(module, markdown):
+    """(line number, line, inside code) for the source lines that become paragraphs: all but fence delimiters"""
+    lines = []
+    fence = None
+    for number, line in enumerate(markdown.splitlines(), 1):
+        marker = module.fence_delimiter(line, fence)
+        if marker:
+            fence = marker if fence is None else None
+            continue
+        lines.append((number, line, fence is not None))
+    return lines
+
+
+def check_file(module, path):
+    """
+    Return (items, problems) for one markdown file
+
+    Every list item must carry a bullet of its kind, and every numbered item
+    must be shown with the number written in the source. problems holds
+    (line number, message) pairs.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        markdown = f.read()
+    text, requests = module.render_markdown(markdown)
+
+    doc = DocsLists(text)
+    try:
+        for request in requests:
+            doc.apply(request)
+    except ValueError as error:
+        return 0, [(0, str(error))]
+    if ''.join(paragraph for paragraph, _ in doc.paragraphs)[:-1] != text:
+        return 0, [(0, "the list requests leave the text changed")]
+
+    items = 0
+    problems = []
+    for (number, line, code), shown in zip(source_paragraphs(module, markdown), doc.numbers()):
+        item = None if code or module.RULE_PATTERN.match(line) else module.LIST_ITEM_PATTERN.match(line)
+        if item is None:
+            if shown is not None:
+                problems.append((number, f"text has a bullet: {line.strip()[:60]}"))
+            continue
+
+        items += 1
+        kind = 'task' if item.group(3) else 'number' if item.group(2) else 'bullet'
+        expected = module.BULLET_PRESETS[kind]
+        if shown is None or shown[0] != expected:
+            problems.append((number, f"{kind} item shown as {shown[0] if shown else 'plain text'}: "
+                                     f"{line.strip()[:60]}"))
+        elif kind == 'number' and shown[2] != int(item.group(2)):
+            problems.append((number, f"item {item.group(2)} shown as number {shown[2]}: {line.strip()[:60]}"))
+    return items, problems
+
+
+def markdown_files(paths):
+    """The .md files among paths, with directories searched (hidden entries skipped)"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+                found.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.endswith('.md') and not name.startswith('.'))
+        else:
+            found.append(path)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check render_markdown's lists against the markdown numbering")
+    parser.add_argument('paths', nargs='*', default=[REPO_ROOT],
+                        help='Markdown files or directories (default: the whole repository)')
+    args = parser.parse_args()
+
+    module = load_sync_module()
+    files = markdown_files(args.paths)
+    items = failed = 0
+    for path in files:
+        count, problems = check_file(module, path)
+        items += count
+        failed += len(problems)
+        for number, message in problems[:MAX_REPORTED]:
+            print(f"❌ {os.path.relpath(path)}:{number}: {message}")
+        if len(problems) > MAX_REPORTED:
+            print(f"   ... and {len(problems) - MAX_REPORTED} more in {os.path.relpath(path)}")
+
+    print(f"{'✅' if not failed else '❌'} Lists: {items} items in {len(files)} files, {failed} problems")
+    sys.exit(0 if not failed else 1)
+
+
+if __name__ == '__main__':
+    main()
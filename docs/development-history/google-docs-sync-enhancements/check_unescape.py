@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Equivalence check and micro-benchmark for the single-pass escape cleaner
+Compares unescape_markdown in sync_to_docs-backup.py with the regex chain it replaced
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from benchmark_sync import SCRIPT_DIR, escape_like_export, load_sync_module, template_text
+
+GOLDEN_FILE = os.path.join(SCRIPT_DIR, 'unescape_golden.json')
+
+# Building blocks for random inputs: every character the cleaner treats
+# specially, runs of backslashes, and line/whitespace variations
+FUZZ_PIECES = ['\\', '\\', '\\\\', '#', '##', '-', '*', '+', '>', '_', '`', '[', ']', '(', ')',
+               '.', '1', '23', '---', '***', ' ', ' ', '\t', '\n', '\n', '\r\n', '\\\n',
+               'a', 'word', 'é', '\u00a0']
+
+
+def legacy_clean(content):
+    """
+    The original clean_escaped_markdown chain: 9 detection searches, then
+    14 re.sub passes. Returns (cleaned, number of indicator types found).
+    """
+    if not content:
+        return content, 0
+
+    escaped_indicators = [
+        r'\\#',          # Escaped headers
+        r'\\-\s',        # Escaped lists
+        r'\\\*.*\\\*',   # Escaped emphasis
+        r'\\\d+\.',      # Escaped numbered lists
+        r'\\>',          # Escaped blockquotes
+        r'\\\[.*\\\]',   # Escaped links
+        r'\\\+',         # Escaped plus signs
+        r'\\\_',         # Escaped underscores in text
+        r'\\\s*$',       # Trailing standalone backslashes
+    ]
+    escape_count = sum(1 for indicator in escaped_indicators if re.search(indicator, content))
+    if escape_count == 0:
+        return content, 0
+
+    patterns = [
+        (r'\\(#{1,6})', r'\1'),
+        (r'(^|\s)\\([-*+])\s', r'\1\2 '),
+        (r'(^|\s)\\(\d+)\.', r'\1\2.'),
+        (r'\\(\d+)\.', r'\1.'),
+        (r'\\(\+)', r'\1'),
+        (r'\\(_)', r'\1'),
+        (r'(?<!\\)\\([*_])', r'\1'),
+        (r'(?<!\\)\\(`)', r'\1'),
+        (r'(?<!\\)\\([\[\]])', r'\1'),
+        (r'(?<!\\)\\([()])', r'\1'),
+        (r'(?<!\\)\\([-*]{3,})', r'\1'),
+        (r'(^|\s)\\(>)\s', r'\1\2 '),
+        (r'\\\s*$', r''),
+        (r'(?<!\\)\\(\.)', r'\1'),
+    ]
+    for pattern, replacement in patterns:
+        content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
+    return content, escape_count
+
+
+def single_pass_clean(module, content):
+    """unescape_markdown as clean_escaped_markdown uses it: (cleaned, indicator types found)"""
+    if not content:
+        return content, 0
+    cleaned, detected, _ = module.unescape_markdown(content)
+    return (cleaned if detected else content), len(detected)
+
+
+def chunked_clean(module, content, rng):
+    """
+    unescape_markdown over the chunks split_markdown_chunks makes of content,
+    fed in random pieces of 1-8 characters with a buffer cap of 1-16, so
+    forced cuts come often. Returns (cleaned, indicator types found).
+    """
+    if not content:
+        return content, 0
+    pieces = []
+    start = 0
+    while start < len(content):
+        size = rng.randint(1, 8)
+        pieces.append(content[start:start + size])
+        start += size
+
+    cleaned = []
+    detected = set()
+    for chunk, final, carried in module.split_markdown_chunks(pieces, rng.randint(1, 16)):
+        chunk, chunk_detected, _ = module.unescape_markdown(chunk, final, carried)
+        cleaned.append(chunk)
+        detected |= chunk_detected
+    return (''.join(cleaned) if detected else content), len(detected)
+
+
+def check_golden(module):
+    """Every golden fixture must come out as recorded, from both cleaners"""
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+
+    failures = 0
+    for case in cases:
+        for name, (cleaned, _) in (('legacy', legacy_clean(case['input'])),
+                                   ('single-pass', single_pass_clean(module, case['input']))):
+            if cleaned != case['expected']:
+                failures += 1
+                print(f"❌ {case['name']} ({name}): expected {case['expected']!r}, got {cleaned!r}")
+    print(f"{'✅' if not failures else '❌'} Golden fixtures: {len(cases)} cases, {failures} failures")
+    return failures == 0
+
+
+def check_fuzz(module, count, seed):
+    """Random inputs must clean, and be detected, exactly as by the legacy chain"""
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(count):
+        content = ''.join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(0, 40)))
+        expected, expected_count = legacy_clean(content)
+        cleaned, detected_count = single_pass_clean(module, content)
+        chunked = chunked_clean(module, content, rng)
+        if not (expected, expected_count) == (cleaned, detected_count) == chunked:
+            failures += 1
+            if failures <= 10:
+                print(f"❌ {content!r}: legacy {expected!r} ({expected_count} types), "
+                      f"single-pass {cleaned!r} ({detected_count} types), chunked {chunked!r}")
+    print(f"{'✅' if not failures else '❌'} Random inputs: {count} cases (seed {seed}), {failures} mismatches")
+    return failures == 0
+
+
+def benchmark(module, sizes_mb, legacy):
+    """Time both cleaners on template text carrying export escapes"""
+    text = escape_like_export(template_text())
+    print(f"\n{'MB':>6} {'single-pass s':>14} {'MB/s':>8}" + (f" {'legacy s':>10} {'speedup':>8}" if legacy else ''))
+    results = []
+    for size_mb in sizes_mb:
+        size = int(size_mb * 1024 * 1024)
+        content = (text * (size // len(text) + 1))[:size]
+
+        start = time.perf_counter()
+        cleaned, _ = single_pass_clean(module, content)
+        seconds = time.perf_counter() - start
+        row = f"{size_mb:>6g} {seconds:>14.3f} {size_mb / seconds:>8.1f}"
+        result = {'size_mb': size_mb, 'seconds': round(seconds, 4)}
+
+        if legacy:
+            start = time.perf_counter()
+            expected, _ = legacy_clean(content)
+            legacy_seconds = time.perf_counter() - start
+            row += f" {legacy_seconds:>10.3f} {legacy_seconds / seconds:>7.1f}x"
+            result['legacy_seconds'] = round(legacy_seconds, 4)
+            result['identical'] = cleaned == expected
+            if cleaned != expected:
+                row += "  ❌ output differs"
+        print(row)
+        results.append(result)
+    return results
+
+
+def update_golden():
+    """
+    Set each fixture's expected value to the legacy chain's output
+
+    New cases are added by appending {"name", "input"} entries to the
+    golden file and running this.
+    """
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+    golden = [{'name': case['name'], 'input': case['input'], 'expected': legacy_clean(case['input'])[0]}
+              for case in cases]
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"💾 Wrote {len(golden)} golden fixtures to {GOLDEN_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check unescape_markdown against the legacy regex chain')
+    parser.add_argument('--fuzz', type=int, default=100000, help='Number of random inputs to compare')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random inputs')
+    parser.add_argument('--sizes', default='1,10,50', help='Comma-separated MB sizes to benchmark (empty to skip)')
+    parser.add_argument('--no-legacy-timing', action='store_true',
+                        help='Benchmark only the single-pass cleaner')
+    parser.add_argument('--update-golden', action='store_true',
+                        help="Record the legacy chain's output as the expected value of every golden fixture")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden()
+        return
+
+    module = load_sync_module()
+    ok = check_golden(module)
+    ok = check_fuzz(module, args.fuzz, args.seed) and ok
+
+    sizes = [float(size) for size in args.sizes.split(',') if size]
+    if sizes:
+        results = benchmark(module, sizes, not args.no_legacy_timing)
+        ok = all(result.get('identical', True) for result in results) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
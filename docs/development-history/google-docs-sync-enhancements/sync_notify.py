@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Thin client for the Google Docs sync daemon
+Asks a running `sync_to_docs-backup.py daemon` to sync, for file watchers
+"""
+
+import json
+import os
+import socket
+import sys
+
+# The daemon listens on this socket, next to the config it syncs
+DAEMON_SOCKET_FILENAME = '.sync_daemon.sock'
+
+# Run with the same arguments when no daemon is listening: the first of
+# these next to this file, unless --sync-script names another
+SYNC_SCRIPTS = ('sync_to_docs.py', 'sync_to_docs-backup.py')
+
+
+def daemon_socket_path(config_file):
+    """The daemon for a config listens next to it"""
+    return os.path.join(os.path.dirname(config_file), DAEMON_SOCKET_FILENAME)
+
+
+def notify_daemon(socket_path, command='sync'):
+    """
+    Send a command to a running sync daemon and wait for its answer
+
+    Returns the daemon's success flag, or None if no daemon is listening.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall((json.dumps({'command': command}) + '\n').encode())
+            reply = client.makefile('r').readline()
+    except OSError:
+        return None
+
+    try:
+        return bool(json.loads(reply).get('success'))
+    except ValueError:
+        return None
+
+
+def resolve_config_path(config):
+    """
+    Find the config file, starting from the script directory
+
+    Moves to the project root when the config is found there or in
+    .claude/scripts, so mapped paths resolve as before. Returns the config
+    path relative to the new working directory, or None if not found.
+    """
+    config_path = config
+    if not os.path.exists(config_path):
+        # Try project root
+        os.chdir('../..')
+        if not os.path.exists(config_path):
+            # Try back in script directory
+            os.chdir('.claude/scripts')
+            if not os.path.exists(config_path):
+                print(f"❌ Config file not found: {config_path}")
+                return None
+            # Config found in script dir, but we need to be in project root for file access
+            os.chdir('../..')
+            config_path = f'.claude/scripts/{config}'
+    return config_path
+
+
+def find_sync_script(script_dir, script=None):
+    """The sync script to push with: script if given, else the first of SYNC_SCRIPTS found"""
+    if script:
+        return os.path.abspath(script)
+    for name in SYNC_SCRIPTS:
+        path = os.path.join(script_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def main():
+    """
+    Ask the daemon to sync, or push directly when none is running
+
+    Takes the sync script's arguments; only --config is read here, and
+    --sync-script PATH (not passed on) picks the script to push with. This
+    file stays small, and imports nothing heavy, so a watcher firing on
+    every save starts close to a bare interpreter.
+    """
+    args = sys.argv[1:]
+    if args and args[0] in ('push', 'notify'):
+        args = args[1:]
+    config = 'sync_config.json'
+    script = None
+    remaining = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == '--sync-script' and i + 1 < len(args):
+            script = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith('--sync-script='):
+            script = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+            if arg == '--config' and i + 1 < len(args):
+                config = args[i + 1]
+            elif arg.startswith('--config='):
+                config = arg.split('=', 1)[1]
+        i += 1
+    args = remaining
+
+    original_dir = os.getcwd()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script = find_sync_script(script_dir, script)
+    os.chdir(script_dir)
+
+    config_path = resolve_config_path(config)
+    if config_path is None:
+        sys.exit(1)
+
+    success = notify_daemon(daemon_socket_path(config_path))
+    if success is not None:
+        print("✅ Sync daemon finished" if success else "❌ Sync daemon reported failures")
+        sys.exit(0 if success else 1)
+
+    if script is None:
+        print(f"❌ Sync daemon not running, and no {' or '.join(SYNC_SCRIPTS)} next to this client "
+              f"- use --sync-script")
+        sys.exit(1)
+    print("⚠️  Sync daemon not running - syncing directly")
+    os.chdir(original_dir)
+    sys.stdout.flush()
+    os.execv(sys.executable, [sys.executable, script, 'push', *args])
+
+
+if __name__ == '__main__':
+    main()
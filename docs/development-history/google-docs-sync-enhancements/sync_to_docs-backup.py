@@ -4,321 +4,2960 @@ Google Docs Sync Script for MADIO Framework
 Syncs local markdown files to Google Docs for Claude Project integration
 """
 
+import collections
+import contextlib
+import datetime
+import hashlib
 import json
 import os
+import random
+import re
+import socket
 import sys
+import threading
+import time
 import argparse
-from pathlib import Path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from urllib.parse import unquote
+
+# Google API libraries (and a few heavier stdlib modules used only when
+# syncing) are imported on first use, so the `notify` client starts quickly
+Request = Credentials = InstalledAppFlow = build = HttpError = None
 
 # Scopes required for Google Docs API
 SCOPES = ['https://www.googleapis.com/auth/documents']
 
+# Pulling exports Docs as markdown through the Google Drive API
+DRIVE_READONLY_SCOPE = 'https://www.googleapis.com/auth/drive.readonly'
+API_VERSIONS = {'docs': 'v1', 'drive': 'v3'}
+EXPORT_MIME_TYPE = 'text/markdown'
+EXPORT_CACHE_DIRNAME = '.sync_export_cache'
+EXPORT_METADATA_FIELDS = 'id,version,modifiedTime'
+
+# Per-user Google Docs API quotas (requests per minute)
+DEFAULT_READ_QUOTA_PER_MINUTE = 300
+DEFAULT_WRITE_QUOTA_PER_MINUTE = 60
+
+# Per-user Google Drive API quota (queries per minute), used by pull and
+# document creation; it is separate from the Docs quotas
+DEFAULT_DRIVE_QUOTA_PER_MINUTE = 12000
+
+# Retry policy for rate limiting (429) and transient server errors (5xx)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+
+# Local record of what was last pushed, stored next to sync_config.json
+MANIFEST_FILENAME = '.sync_manifest.json'
+
+# Daemon mode: watch mapped files and accept sync requests on a local socket
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DAEMON_POLL_SECONDS = 0.5
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Pre-flight document lookups, sent as HTTP batch requests
+DOC_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{20,}')
+PREFLIGHT_BATCH_SIZE = 50
+PREFLIGHT_FIELDS = 'documentId,revisionId,body(content(endIndex))'
+
+# Instrumentation: with metrics disabled, every span is this shared no-op
+NO_METRICS = contextlib.nullcontext()
+RUN_RECORD = '(run)'
+
+# Files at least this large are streamed to Google Docs in chunks
+STREAM_THRESHOLD_BYTES = 4 * 1024 * 1024
+STREAM_CHUNK_CHARS = 256 * 1024
+STREAM_MAX_BUFFER_CHARS = 4 * STREAM_CHUNK_CHARS
+FORCED_CUT_WINDOW_CHARS = 4096
+MAX_BATCH_INSERT_CHARS = 2 * 1024 * 1024
+
+# Creating Google Docs for unmapped files, in the config's _google_drive_folder
+DRIVE_FILE_SCOPE = 'https://www.googleapis.com/auth/drive.file'
+PROVISION_PLACEHOLDERS = {'CREATE_NEW_DOCUMENT', 'REPLACE_WITH_GOOGLE_DOC_ID'}
+DIRECTORY_MAPPING_FILENAME = '.synced_docs_mapping.json'
+DRIVE_INDEX_FILENAME = '.sync_drive_index.json'
+DEFAULT_DRIVE_FOLDER_NAME = 'MADIO Documents'
+GOOGLE_DOC_MIME_TYPE = 'application/vnd.google-apps.document'
+GOOGLE_FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+DRIVE_BATCH_SIZE = 50
+DRIVE_LIST_FIELDS = 'nextPageToken,files(id,name,mimeType,parents)'
+DRIVE_CHANGES_FIELDS = ('nextPageToken,newStartPageToken,'
+                        'changes(fileId,removed,file(id,name,mimeType,parents,trashed))')
+
+# Project document validation, switched on by the .madio config
+MADIO_CONFIG_FILENAME = '.madio'
+MAX_REPORTED_ISSUES = 50
+FENCE_PATTERN = re.compile(r' {0,3}(`{3,}|~{3,})')
+HEADING_PATTERN = re.compile(r'#{1,6}[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+ANCHOR_PATTERN = re.compile(r'<a\s+(?:name|id)=["\']([^"\']+)["\']|\{#([\w-]+)\}')
+SLUG_STRIP_PATTERN = re.compile(r'[^\w\- ]')
+BRACKET_PATTERN = re.compile(r'\[([^\[\]\n]{2,})\](?!\()')
+PLACEHOLDER_PATTERN = re.compile(r'[A-Z][A-Z0-9_]+')
+TEMPLATE_LIBRARY_DIRNAME = '_template_library'
+LINK_PATTERN = re.compile(r'\[[^\]]*\]\(\s*<?([^)\s>]*)>?(?:\s+["\'][^)]*)?\)')
+FILE_MENTION_PATTERN = re.compile(r'`([^`\s]+\.md(?:#[^`\s]+)?)`')
+
+# Rendering markdown as native Docs formatting
+RENDER_CODE_FONT = 'Courier New'
+RENDER_INDENT_POINTS = 36
+MAX_LIST_LEVEL = 8
+BULLET_PRESETS = {
+    'bullet': 'BULLET_DISC_CIRCLE_SQUARE',
+    'number': 'NUMBERED_DECIMAL_ALPHA_ROMAN',
+    'task': 'BULLET_CHECKBOX',
+}
+RENDER_TEXT_FIELDS = 'bold,italic,strikethrough,link,weightedFontFamily'
+LIST_ITEM_PATTERN = re.compile(r'([ \t]*)(?:[-*+]|(\d+)[.)])[ \t]+(\[[ xX]\][ \t]+)?')
+RULE_PATTERN = re.compile(r' {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+QUOTE_PATTERN = re.compile(r' {0,3}> ?')
+LINK_URL_PATTERN = re.compile(r'(?:https?|mailto):', re.IGNORECASE)
+INLINE_PATTERN = re.compile(
+    r'\\(?P<escaped>[\\`*_{}\[\]()#+\-.!~>|])'
+    r'|(?P<ticks>`+)(?P<code>.+?)(?<!`)(?P=ticks)(?!`)'
+    r'|!?\[(?P<link>[^\]]*)\]\((?P<url>[^)\s]*)(?:\s+"[^"]*")?\)'
+    r'|\*\*(?=\S)(?P<strong>.+?)(?<=\S)\*\*'
+    r'|(?<!\w)__(?=\S)(?P<strong_under>.+?)(?<=\S)__(?!\w)'
+    r'|~~(?=\S)(?P<strike>.+?)(?<=\S)~~'
+    r'|(?<![\w*])\*(?=[^\s*])(?P<em>.+?)(?<=[^\s*])\*(?![\w*])'
+    r'|(?<!\w)_(?=\S)(?P<em_under>.+?)(?<=\S)_(?!\w)'
+)
+INLINE_STYLES = {
+    'strong': 'bold', 'strong_under': 'bold',
+    'strike': 'strikethrough',
+    'em': 'italic', 'em_under': 'italic',
+}
+
+# Escaped markdown cleaning: every edit happens at a run of backslashes
+ESCAPE_RUN_PATTERN = re.compile(r'\\+')
+WHITESPACE_PATTERN = re.compile(r'\s')
+WHITESPACE_RUN_PATTERN = re.compile(r'\s*')
+NUMBERED_ITEM_PATTERN = re.compile(r'\d+\.')
+# Every escape indicator is a backslash before one of these (or the end)
+ESCAPE_HINT_PATTERN = re.compile(r'\\(?:[-#>+_*\]\d\s]|$)')
+# Cuts for a chunk with no line break followed by non-whitespace (see chunk_cut)
+FORCED_CUT_PATTERN = re.compile(r'(?<![\s\\])\s*\n(?=\s)|(?<=\s)(?=[^\s\\])|(?<=[^\W\d_])(?=[^\W\d_])')
+SINGLE_ESCAPE_CATEGORIES = {
+    '`': 'inline code',
+    '[': 'links', ']': 'links', '(': 'links', ')': 'links',
+    '.': 'periods',
+}
+
+
+def load_google_libraries():
+    """Import the Google API client libraries into module globals"""
+    global Request, Credentials, InstalledAppFlow, build, HttpError
+    if HttpError is not None:
+        return
+    
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+
+
+def utf16_length(text):
+    """Length of text in UTF-16 code units, the unit of Google Docs indexes"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def file_sha256(file_path, block_size=1024 * 1024):
+    """Hash a file's bytes without loading it whole"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_file_atomic(file_path, content):
+    """Write text to file_path via a temporary file so readers never see it half-written"""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+
+
+def _is_rule(content, index):
+    """True if a horizontal rule ([-*]{3,}) starts at index once \\* escapes are gone"""
+    count = 0
+    while index < len(content) and count < 3:
+        char = content[index]
+        if char in '-*':
+            count += 1
+        elif not (char == '\\' and content[index + 1:index + 2] == '*'):
+            break
+        index += 1
+    return count >= 3
+
+
+def heading_anchor(title):
+    """GitHub-style anchor for a heading: lowercase, punctuation dropped, spaces as dashes"""
+    return SLUG_STRIP_PATTERN.sub('', title.strip().lower()).replace(' ', '-')
+
+
+def fence_delimiter(line, fence):
+    """
+    The fence marker if line opens a code block (fence is None) or closes
+    the open one, else None
+    
+    A closing fence uses the opening character, at least as many times,
+    with nothing after it: a line like ```python inside a block is code.
+    """
+    match = FENCE_PATTERN.match(line)
+    if match is None:
+        return None
+    marker = match.group(1)
+    if fence is None:
+        return marker
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not line[match.end():].strip():
+        return marker
+    return None
+
+
+def find_madio_config(directory):
+    """Return the .madio file in directory or its nearest ancestor, or None"""
+    directory = os.path.abspath(directory)
+    while True:
+        path = os.path.join(directory, MADIO_CONFIG_FILENAME)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def discover_markdown_files(directory):
+    """Paths of the markdown files under directory, relative to it, skipping hidden entries"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if name.endswith('.md') and not name.startswith('.'):
+                relative = os.path.relpath(os.path.join(root, name), directory)
+                found.append(relative.replace(os.sep, '/'))
+    return found
+
+
+def drive_query_string(value):
+    """Quote value for a Drive files.list query"""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def has_placeholder_ids(config_file):
+    """True if a config file maps any file to a document still to be created"""
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+        return any(not key.startswith('_') and value in PROVISION_PLACEHOLDERS
+                   for key, value in config.items())
+    except (OSError, ValueError, AttributeError, TypeError):
+        return False
+
+
+def render_inline(text, emit, styles=()):
+    """Emit the text of one line of inline markdown, with the styles of each run"""
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        emit(text[position:match.start()], styles)
+        position = match.end()
+        
+        if match.group('escaped') is not None:
+            emit(match.group('escaped'), styles)
+        elif match.group('code') is not None:
+            emit(match.group('code'), styles + ('code',))
+        elif match.group('link') is not None:
+            url = match.group('url')
+            # Relative links (other markdown files) mean nothing inside Docs
+            link = (('link', url),) if LINK_URL_PATTERN.match(url) else ()
+            render_inline(match.group('link'), emit, styles + link)
+        else:
+            group = next(name for name in INLINE_STYLES if match.group(name) is not None)
+            render_inline(match.group(group), emit, styles + (INLINE_STYLES[group],))
+    emit(text[position:], styles)
+
+
+def merge_ranges(ranges):
+    """Merge (start, end, key) ranges that share a key and touch or overlap"""
+    merged = []
+    for start, end, key in sorted(ranges, key=lambda item: (repr(item[2]), item[0])):
+        if merged and merged[-1][2] == key and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end, key])
+    return merged
+
+
+def list_runs(items):
+    """
+    Split the (start, end, level, kind) items of a list block into Docs lists
+    
+    The block is one list of its first item's kind. An item of another
+    kind starts a list of its own, holding it, its same-kind siblings and
+    everything nested below them. Returns (kind, items) runs, every run
+    before the runs nested in it.
+    """
+    runs = [(items[0][3], items)]
+    for kind, run in runs:
+        i = 1
+        while i < len(run):
+            level, item_kind = run[i][2], run[i][3]
+            if item_kind == kind:
+                i += 1
+                continue
+            end = i + 1
+            while end < len(run) and (run[end][2] > level or (run[end][2] == level and run[end][3] == item_kind)):
+                end += 1
+            runs.append((item_kind, run[i:end]))
+            i = end
+    return runs
+
+
+def list_requests(items, gaps):
+    """
+    Requests turning a block of list items into Docs bullets
+    
+    Each run from list_runs gets a single createParagraphBullets over all
+    of its paragraphs, so Docs numbers it as one list across blank lines
+    and nested text; those gap paragraphs lose their bullets again right
+    after. Nesting is given by leading tabs, which createParagraphBullets
+    turns into levels and removes, leaving the text as it was.
+    """
+    requests = []
+    for kind, run in list_runs(items):
+        start, end = run[0][0], run[-1][1]
+        tabs = 0
+        for item_start, _, level, _ in reversed(run):
+            if level:
+                requests.append({'insertText': {'location': {'index': item_start}, 'text': '\t' * level}})
+                tabs += level
+        requests.append({'createParagraphBullets': {
+            'range': {'startIndex': start, 'endIndex': end + tabs}, 'bulletPreset': BULLET_PRESETS[kind]}})
+        for gap_start, gap_end, _ in merge_ranges([gap + (None,) for gap in gaps if start < gap[0] < end]):
+            requests.append({'deleteParagraphBullets': {'range': {'startIndex': gap_start, 'endIndex': gap_end}}})
+    return requests
+
+
+def render_markdown(markdown):
+    """
+    Convert markdown into plain Docs text plus the requests that format it
+    
+    Returns (text, requests). Every markdown line stays one paragraph;
+    markup is dropped from the text and expressed as headings, bullets,
+    indents and text styles instead. The requests restyle the whole body
+    and assume it holds exactly text (plus Docs' final newline), so they
+    go after the text edits in the same batch. Ranges sharing a style are
+    merged, so the request count follows styled runs rather than lines.
+    
+    A list block runs from an item over further items, blank lines and
+    indented (or lazily continued) text, up to any other line or an item
+    of another kind at the top level; it becomes one Docs list (see
+    list_requests), so numbering carries on as in the markdown.
+    """
+    pieces = []
+    position = 1
+    headings, lists, indents, spans = [], [], [], []
+    fence = None
+    # The open list block: kind and indent of its first item, indents of
+    # the enclosing items, its items and gap paragraphs, and whether the
+    # previous line was text (which an unindented line lazily continues)
+    block = None
+    
+    def emit(text, styles=()):
+        nonlocal position
+        if not text:
+            return
+        end = position + utf16_length(text)
+        for style in styles:
+            spans.append((position, end, style))
+        pieces.append(text)
+        position = end
+    
+    def close_list():
+        nonlocal block
+        if block:
+            lists.extend(list_requests(block['items'], block['gaps']))
+        block = None
+    
+    for line in markdown.splitlines(keepends=True):
+        body = line.rstrip('\r\n')
+        newline = '\n' if len(body) < len(line) else ''
+        start = position
+        if block and body.startswith('\t'):
+            # Leading tabs of a paragraph in a list would become nesting
+            stripped = body.lstrip(' \t')
+            body = body[:len(body) - len(stripped)].expandtabs(4) + stripped
+        
+        marker = fence_delimiter(body, fence)
+        if marker:
+            if fence is None and not body[:1].isspace():
+                close_list()
+            fence = marker if fence is None else None
+            continue
+        if fence is not None:
+            emit(body + newline, ('code',))
+            if block:
+                block['gaps'].append((start, position))
+                block['text'] = False
+            continue
+        
+        heading = HEADING_PATTERN.match(body) if body.startswith('#') else None
+        quote = QUOTE_PATTERN.match(body)
+        rule = RULE_PATTERN.match(body)
+        item = LIST_ITEM_PATTERN.match(body) if not rule else None
+        
+        gap = False
+        if block and not item:
+            if not body.strip() or body[:1].isspace() or (block['text'] and not (heading or quote or rule)):
+                gap = True
+                block['text'] = bool(body.strip())
+            else:
+                close_list()
+        
+        if heading:
+            render_inline(heading.group(1), emit)
+            headings.append((start, position + len(newline), len(body) - len(body.lstrip('#'))))
+        elif quote:
+            render_inline(body[quote.end():], emit)
+            indents.append((start, position + len(newline), (RENDER_INDENT_POINTS, RENDER_INDENT_POINTS)))
+        elif item:
+            indent = len(item.group(1).expandtabs(4))
+            kind = 'task' if item.group(3) else 'number' if item.group(2) else 'bullet'
+            if block and kind != block['kind'] and indent <= block['indent']:
+                close_list()
+            if block is None:
+                block = {'kind': kind, 'indent': indent, 'stack': [], 'items': [], 'gaps': [], 'text': True}
+            stack = block['stack']
+            while stack and stack[-1] > indent:
+                stack.pop()
+            if not stack or stack[-1] < indent:
+                stack.append(indent)
+            
+            render_inline(body[item.end():], emit)
+            block['items'].append((start, position + len(newline), min(len(stack) - 1, MAX_LIST_LEVEL), kind))
+            block['text'] = True
+        else:
+            render_inline(body, emit)
+        emit(newline)
+        if gap and start < position:
+            block['gaps'].append((start, position))
+    close_list()
+    
+    text = ''.join(pieces)
+    if position == 1:
+        return text, []
+    
+    whole = {'startIndex': 1, 'endIndex': position}
+    requests = [
+        {'updateParagraphStyle': {'range': whole, 'paragraphStyle': {'namedStyleType': 'NORMAL_TEXT'},
+                                  'fields': 'namedStyleType,indentStart,indentFirstLine'}},
+        {'deleteParagraphBullets': {'range': whole}},
+        {'updateTextStyle': {'range': whole, 'textStyle': {}, 'fields': RENDER_TEXT_FIELDS}},
+    ]
+    
+    for start, end, level in merge_ranges(headings):
+        if start < end:
+            requests.append({'updateParagraphStyle': {
+                'range': {'startIndex': start, 'endIndex': end},
+                'paragraphStyle': {'namedStyleType': f"HEADING_{level}"},
+                'fields': 'namedStyleType'}})
+    
+    requests.extend(lists)
+    
+    # After the bullets, which reset the indentation of their paragraphs
+    for start, end, (indent, first_line) in merge_ranges(indents):
+        if start < end:
+            requests.append({'updateParagraphStyle': {
+                'range': {'startIndex': start, 'endIndex': end},
+                'paragraphStyle': {'indentStart': {'magnitude': indent, 'unit': 'PT'},
+                                   'indentFirstLine': {'magnitude': first_line, 'unit': 'PT'}},
+                'fields': 'indentStart,indentFirstLine'}})
+    
+    for start, end, style in merge_ranges(spans):
+        if style == 'code':
+            text_style, fields = {'weightedFontFamily': {'fontFamily': RENDER_CODE_FONT}}, 'weightedFontFamily'
+        elif isinstance(style, tuple):
+            text_style, fields = {'link': {'url': style[1]}}, 'link'
+        else:
+            text_style, fields = {style: True}, style
+        requests.append({'updateTextStyle': {
+            'range': {'startIndex': start, 'endIndex': end}, 'textStyle': text_style, 'fields': fields}})
+    
+    return text, requests
+
+
+def chunk_cut(text, start=0, forced=False):
+    """
+    Where a chunk of text can end so that unescape_markdown cleans it as
+    part of the whole; returns the index the chunk ends at, or -1
+    
+    Searches from start for the last line break followed by non-whitespace,
+    since a trailing backslash is removed with all whitespace up to the last
+    line break it reaches. With forced, for when there is none, it looks
+    instead for the last line break in whitespace that no backslash comes
+    right before, point after whitespace and before anything but whitespace
+    or a backslash, or point between two letters; mid-line cuts need
+    line_escapes. Forced cuts are searched for backwards from the end, in
+    growing windows, so a cut near the end is found without a full scan.
+    """
+    if not forced:
+        cut = text.rfind('\n', start)
+        while cut != -1:
+            if cut + 1 < len(text) and WHITESPACE_PATTERN.match(text, cut + 1) is None:
+                return cut + 1
+            cut = text.rfind('\n', start, cut)
+        return -1
+    
+    cut = -1
+    window = FORCED_CUT_WINDOW_CHARS
+    while cut == -1:
+        low = max(start, len(text) - window)
+        for match in FORCED_CUT_PATTERN.finditer(text, low):
+            if 0 < match.end() < len(text):
+                cut = match.end()
+        if low == start:
+            break
+        window *= 8
+    return cut
+
+
+def line_escapes(text, carried=frozenset()):
+    """
+    The \\* and \\[ escapes on the last line of text (with carried, if it has no line break)
+    
+    unescape_markdown pairs them with later ones on the same line to detect
+    emphasis and links, so a chunk cut mid-line passes them on.
+    """
+    newline = text.rfind('\n')
+    found = frozenset(char for char in '*[' if '\\' + char in text[newline + 1:])
+    return found if newline != -1 else found | carried
+
+
+def split_markdown_chunks(pieces, max_chars=STREAM_MAX_BUFFER_CHARS):
+    """
+    Regroup pieces of text into (chunk, final, carried) chunks
+    
+    unescape_markdown(chunk, final, carried) gives, chunk by chunk, the same
+    result as on the whole text. Chunks end where chunk_cut allows; a
+    buffer reaching max_chars without such a cut (a long indented stretch,
+    a very long line) is cut with forced, so it stays within max_chars plus
+    one piece. Only newly added text is searched for a cut.
+    """
+    buffer = ''
+    carried = frozenset()
+    searched = forced_from = 0
+    for piece in pieces:
+        buffer += piece
+        cut = chunk_cut(buffer, searched)
+        if cut == -1 and len(buffer) >= max_chars:
+            # Forced cuts were searched for up to forced_from already
+            cut = chunk_cut(buffer, forced_from, forced=True)
+            forced_from = max(len(buffer) - 1, 0)
+        
+        if cut != -1:
+            chunk = buffer[:cut]
+            yield chunk, False, carried
+            carried = line_escapes(chunk, carried)
+            buffer = buffer[cut:]
+            forced_from = 0
+        # A line break at the very end is judged once the next piece is in
+        searched = max(len(buffer) - 1, 0)
+    
+    if buffer:
+        yield buffer, True, carried
+
+
+def unescape_markdown(content, final=True, carried=frozenset()):
+    """
+    Remove Google Docs markdown export escapes in a single scan
+    
+    Produces exactly the output of the original chain of 14 re.sub passes
+    (headers, lists, numbered lists, plus signs, underscores, emphasis,
+    inline code, links, horizontal rules, blockquotes, trailing
+    backslashes, periods), including how those passes interact, by
+    deciding at each run of backslashes how many of them the chain
+    would have removed.
+    
+    Returns (cleaned, detected, changes): detected is the set of escape
+    indicator types found and changes maps each category to the number of
+    escapes removed. Like the original, callers should keep the content
+    as-is when no indicator is detected anywhere in it.
+    
+    Pass final=False and the carried escapes for the chunks produced by
+    split_markdown_chunks, all but the last of which end before more content.
+    """
+    length = len(content)
+    chunks = []
+    changes = {}
+    detected = set()
+    cursor = 0
+    list_end = quote_end = -1       # end of the previous list/blockquote match
+    # For the \*...\* and \[...\] indicators, which may open in an earlier chunk
+    last_star = 0 if '*' in carried else -1
+    last_bracket = 0 if '[' in carried else -1
+    
+    for run in ESCAPE_RUN_PATTERN.finditer(content):
+        start, end = run.span()
+        size = end - start
+        char = content[end:end + 1]
+        category = None
+        removed = 1
+        
+        if char == '#':
+            detected.add('headers')
+            category = 'headers'
+        
+        elif char == '_':
+            detected.add('underscores')
+            category = 'underscores'
+            # \\_ becomes \_ first, which the emphasis pattern then unescapes
+            if size == 2:
+                removed = 2
+                changes['emphasis'] = changes.get('emphasis', 0) + 1
+        
+        elif char in SINGLE_ESCAPE_CATEGORIES:
+            if char == '[':
+                last_bracket = end
+            elif char == ']' and last_bracket >= 0 and content.find('\n', last_bracket, start) == -1:
+                detected.add('links')
+            if size == 1:
+                category = SINGLE_ESCAPE_CATEGORIES[char]
+        
+        elif char in ('-', '*', '+', '>'):
+            # (^|\s) before the run and \s after the escaped character, as
+            # used by the list and blockquote patterns
+            line_start = start == 0 or content[start - 1] == '\n'
+            before_space = WHITESPACE_PATTERN.match(content, end + 1) is not None
+            spaced = (size == 1 and before_space
+                      and (line_start or WHITESPACE_PATTERN.match(content, start - 1) is not None))
+            
+            if char == '-' and before_space:
+                detected.add('lists')
+            elif char == '+':
+                detected.add('plus signs')
+            elif char == '*':
+                if last_star >= 0 and content.find('\n', last_star, start) == -1:
+                    detected.add('emphasis')
+                last_star = end
+            elif char == '>':
+                detected.add('blockquotes')
+            
+            # A list/blockquote match consumes its trailing whitespace, so an
+            # adjacent escape can only match again at the start of a line
+            if char == '>':
+                if spaced and not (quote_end == start and not line_start):
+                    category = 'blockquotes'
+                    quote_end = end + 2
+            elif spaced and not (list_end == start and not line_start):
+                category = 'lists'
+                list_end = end + 2
+            elif char == '+':
+                category = 'plus signs'
+            elif size == 1 and char == '*':
+                category = 'emphasis'
+            elif size == 1 and _is_rule(content, end):
+                category = 'horizontal rules'
+            
+            if category in ('lists', 'blockquotes'):
+                changes[category] = changes.get(category, 0) + 1
+                chunks.append(content[cursor:start])
+                chunks.append(char + ' ')
+                cursor = end + 2
+                continue
+        
+        elif NUMBERED_ITEM_PATTERN.match(content, end):
+            detected.add('numbered lists')
+            category = 'numbered lists'
+        
+        elif not char or WHITESPACE_PATTERN.match(char):
+            # \\\s*$ drops the backslash and any whitespace up to the last
+            # line break it can reach (all of it at the end of the content)
+            space_end = WHITESPACE_RUN_PATTERN.match(content, end).end()
+            if space_end == length and final:
+                detected.add('trailing backslashes')
+                cut = length
+            else:
+                cut = content.rfind('\n', end, space_end)
+            
+            if cut != -1:
+                changes['trailing backslashes'] = changes.get('trailing backslashes', 0) + 1
+                chunks.append(content[cursor:start])
+                chunks.append('\\' * (size - 1))
+                cursor = cut
+            continue
+        
+        if category:
+            changes[category] = changes.get(category, 0) + 1
+            chunks.append(content[cursor:start])
+            chunks.append('\\' * (size - removed))
+            cursor = end
+    
+    chunks.append(content[cursor:])
+    return ''.join(chunks), detected, changes
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all sync workers
+
+    Tokens refill continuously at rate_per_minute / 60 per second, up to
+    `burst`. acquire() blocks until a token is available, so concurrent
+    workers never exceed the configured quota between them.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, rate_per_minute // 6))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SyncManifest:
+    """
+    Persistent record of the last successful sync of each file
+
+    Each entry holds the file's size, mtime and content hash at the time
+    it was pushed, plus the Google Doc revisionId the push produced. The
+    mtime/size pair lets unchanged files skip hashing; the hash lets
+    touched-but-identical files skip the network; the revisionId detects
+    edits made in Google Docs since the last push.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load entries from disk, starting fresh if missing or corrupt"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f).get('files', {})
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"⚠️  Ignoring unreadable sync manifest {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Atomically write entries to disk"""
+        with self.lock:
+            data = json.dumps({'version': 1, 'files': self.entries}, indent=2, sort_keys=True)
+        write_file_atomic(self.path, data)
+
+    def get(self, file_path):
+        with self.lock:
+            return self.entries.get(file_path)
+
+    def record(self, file_path, **fields):
+        with self.lock:
+            self.entries.setdefault(file_path, {}).update(fields)
+
+
+class ExportCache:
+    """
+    Local copies of Drive markdown exports, keyed by document ID
+
+    Each export is stored as <doc_id>.md with the Drive file version it was
+    taken from, so an unchanged document never has to be exported again.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = SyncManifest(os.path.join(directory, 'index.json'))
+
+    def load(self, doc_id, version):
+        """Return the cached export of doc_id at version, or None"""
+        entry = self.index.get(doc_id)
+        if not entry or entry.get('version') != version:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{doc_id}.md"), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, doc_id, version, modified_time, content):
+        os.makedirs(self.directory, exist_ok=True)
+        write_file_atomic(os.path.join(self.directory, f"{doc_id}.md"), content)
+        self.index.record(doc_id, version=version, modified_time=modified_time)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.index.save()
+
+
+class DriveFolderIndex:
+    """
+    Local copy of the Drive folder tree that new documents are created in
+
+    Entries map Drive file IDs to the name, parent and kind (folder or
+    Google Doc) of everything under one root folder. The Drive changes page
+    token stored with them lets later runs replay only what changed since,
+    instead of listing the tree again. Folders are listed lazily, the first
+    time a document is created in them; 'listed' marks the ones that were.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reset(None)
+        self.load()
+
+    def reset(self, root):
+        """Forget everything and start over from the folder root"""
+        self.root = root
+        self.token = None
+        self.entries = {}
+        self.locations = {}
+        if root:
+            self.add(root, '', None, folder=True)
+
+    def load(self):
+        """Load the index from disk, starting fresh if missing or corrupt"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.root = data['root']
+            self.token = data['token']
+            for file_id, entry in data['entries'].items():
+                self.add(file_id, entry['name'], entry['parent'], entry['folder'], entry['listed'])
+        except (json.JSONDecodeError, OSError, KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️  Ignoring unreadable Drive folder index {self.path}: {e}")
+            self.reset(None)
+
+    def save(self):
+        """Atomically write the index to disk"""
+        data = json.dumps({'version': 1, 'root': self.root, 'token': self.token,
+                           'entries': self.entries}, indent=2, sort_keys=True)
+        write_file_atomic(self.path, data)
+
+    def add(self, file_id, name, parent, folder, listed=False):
+        self.remove(file_id)
+        self.entries[file_id] = {'name': name, 'parent': parent, 'folder': folder, 'listed': listed}
+        self.locations[(parent, name, folder)] = file_id
+
+    def remove(self, file_id):
+        entry = self.entries.pop(file_id, None)
+        if entry:
+            key = (entry['parent'], entry['name'], entry['folder'])
+            if self.locations.get(key) == file_id:
+                del self.locations[key]
+
+    def find(self, parent, name, folder):
+        """ID of the folder or Google Doc called name directly inside parent, or None"""
+        return self.locations.get((parent, name, folder))
+
+    def add_file(self, file, parent):
+        """Record a Drive files resource found inside parent"""
+        previous = self.entries.get(file['id'])
+        folder = file.get('mimeType') == GOOGLE_FOLDER_MIME_TYPE
+        listed = bool(previous and previous['folder'] and previous['listed'])
+        self.add(file['id'], file['name'], parent, folder, listed)
+
+    def apply_changes(self, changes):
+        """
+        Bring the index up to date with a Drive changes.list feed
+
+        Files moved out of the tree, trashed or deleted are dropped, along
+        with everything below them. Changed files are applied until nothing
+        else fits, so a new folder is in place before the files moved into it.
+        """
+        pending = {}
+        for change in changes:
+            file = change.get('file') or {}
+            kind = file.get('mimeType')
+            if (change.get('removed') or file.get('trashed')
+                    or kind not in (GOOGLE_DOC_MIME_TYPE, GOOGLE_FOLDER_MIME_TYPE)):
+                pending.pop(change['fileId'], None)
+                self.remove(change['fileId'])
+            else:
+                pending[file['id']] = file
+
+        progress = True
+        while pending and progress:
+            progress = False
+            for file_id, file in list(pending.items()):
+                parent = next((parent for parent in file.get('parents', [])
+                               if self.entries.get(parent, {}).get('folder')), None)
+                if parent is not None:
+                    self.add_file(file, parent)
+                    del pending[file_id]
+                    progress = True
+        for file_id in pending:
+            if file_id != self.root:
+                self.remove(file_id)
+
+        # Drop whatever lost its way to the root folder
+        reachable = {self.root}
+        children = {}
+        for file_id, entry in self.entries.items():
+            children.setdefault(entry['parent'], []).append(file_id)
+        stack = [self.root]
+        while stack:
+            for child in children.get(stack.pop(), []):
+                if child not in reachable:
+                    reachable.add(child)
+                    stack.append(child)
+        for file_id in [file_id for file_id in self.entries if file_id not in reachable]:
+            self.remove(file_id)
+
+
+class DocumentIndex:
+    """
+    Headings, anchors, bracketed text and outbound references of project documents
+
+    Each document is read once, line by line, skipping fenced code blocks.
+    Bracketed text not followed by a link target is a placeholder if it is
+    an [ALL_CAPS] token or one of the known (template) placeholders.
+    Entries are reused while a file's size and mtime are unchanged, so
+    validate() only re-scans edited documents, and only rechecks the
+    references of edited documents, of documents pointing at them, and of
+    documents whose references depend on files outside the index.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.by_name = {}
+        self.referrers = {}
+        self.reference_issues = {}
+        self.outside = set()
+
+    def scan(self, path):
+        """Index one document in a single pass"""
+        anchors = set()
+        seen = {}
+        brackets = []
+        references = []
+        fence = None
+
+        with open(path, 'r', encoding='utf-8') as file:
+            for number, line in enumerate(file, 1):
+                marker = fence_delimiter(line, fence)
+                if marker:
+                    fence = marker if fence is None else None
+                    continue
+                if fence is not None:
+                    continue
+
+                if line.startswith('#'):
+                    heading = HEADING_PATTERN.match(line)
+                    if heading:
+                        anchor = heading_anchor(heading.group(1))
+                        count = seen.get(anchor, 0)
+                        seen[anchor] = count + 1
+                        anchors.add(f"{anchor}-{count}" if count else anchor)
+                if '<a' in line or '{#' in line:
+                    for match in ANCHOR_PATTERN.finditer(line):
+                        anchors.add(match.group(1) or match.group(2))
+                if '[' in line:
+                    for match in BRACKET_PATTERN.finditer(line):
+                        brackets.append((number, match.group(1)))
+                    for match in LINK_PATTERN.finditer(line):
+                        target = match.group(1)
+                        if target and '://' not in target and not target.startswith(('mailto:', 'tel:')):
+                            references.append((number, target))
+                if '`' in line:
+                    for match in FILE_MENTION_PATTERN.finditer(line):
+                        references.append((number, match.group(1)))
+
+        # A reference like `[document_name].md` is itself a placeholder
+        references = [(number, target) for number, target in references if '[' not in target]
+
+        return {
+            'anchors': anchors,
+            'brackets': brackets,
+            'references': [(number, unquote(target.partition('#')[0]), target.partition('#')[2], target)
+                           for number, target in references],
+        }
+
+    def add(self, path, entry):
+        self.entries[path] = entry
+        self.by_name.setdefault(os.path.basename(path), set()).add(path)
+        for _, target, _, _ in entry['references']:
+            if target:
+                self.referrers.setdefault(os.path.basename(target), set()).add(path)
+
+    def remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is None:
+            return
+        self.by_name.get(os.path.basename(path), set()).discard(path)
+        for _, target, _, _ in entry['references']:
+            self.referrers.get(os.path.basename(target), set()).discard(path)
+        self.reference_issues.pop(path, None)
+        self.outside.discard(path)
+
+    def resolve(self, path, target, root):
+        """
+        Find the document a reference points at
+        
+        Returns its indexed path, '' for an existing file outside the
+        index (whose anchors are not checked), or None if nothing matches.
+        Backticked mentions usually give a bare file name, so indexed
+        documents are also matched by name.
+        """
+        if not target:
+            return path
+        candidate = os.path.normpath(os.path.join(os.path.dirname(path), target))
+        if candidate in self.entries:
+            return candidate
+        named = self.by_name.get(os.path.basename(target))
+        if named:
+            return min(named)
+        if os.path.exists(candidate) or os.path.exists(os.path.join(root, target)):
+            return ''
+        return None
+
+    def check_references(self, path, root):
+        issues = []
+        self.outside.discard(path)
+        for number, target, anchor, raw in self.entries[path]['references']:
+            resolved = self.resolve(path, target, root)
+            if resolved in (None, ''):
+                self.outside.add(path)
+            if resolved is None:
+                issues.append((path, number, f"broken reference to {raw}"))
+            elif resolved and anchor and anchor not in self.entries[resolved]['anchors']:
+                issues.append((path, number, f"no heading or anchor #{anchor} in {os.path.basename(resolved)}"))
+        return issues
+
+    def validate(self, paths, root='.', check_references=True, check_placeholders=True,
+                 known_placeholders=frozenset()):
+        """
+        Bring the index up to date with paths and return (issues, rescanned)
+        
+        issues is a sorted list of (path, line, message); rescanned is the
+        number of documents that had to be read.
+        """
+        paths = list(dict.fromkeys(os.path.normpath(path) for path in paths))
+        wanted = set(paths)
+        changed = set()
+        issues = []
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                key = (stat.st_mtime_ns, stat.st_size)
+                if path in self.entries and self.entries[path]['stat'] == key:
+                    continue
+                entry = self.scan(path)
+            except (OSError, UnicodeDecodeError) as e:
+                self.remove(path)
+                changed.add(path)
+                issues.append((path, 0, f"could not read document: {e}"))
+                continue
+            entry['stat'] = key
+            self.remove(path)
+            self.add(path, entry)
+            changed.add(path)
+
+        for path in set(self.entries) - wanted:
+            self.remove(path)
+            changed.add(path)
+
+        if check_references:
+            recheck = changed | self.outside
+            for name in {os.path.basename(path) for path in changed}:
+                recheck |= self.referrers.get(name, set())
+            for path in recheck & set(self.entries):
+                self.reference_issues[path] = self.check_references(path, root)
+            for path in paths:
+                issues.extend(self.reference_issues.get(path, []))
+
+        if check_placeholders:
+            for path in paths:
+                for number, name in self.entries.get(path, {}).get('brackets', []):
+                    if name in known_placeholders or PLACEHOLDER_PATTERN.fullmatch(name):
+                        issues.append((path, number, f"unreplaced placeholder [{name}]"))
+
+        return sorted(issues), len(changed & wanted)
+
+    def bracketed(self):
+        """The bracketed texts of all indexed documents that contain a letter"""
+        return frozenset(name for entry in self.entries.values() for _, name in entry['brackets']
+                         if any(char.isalpha() for char in name))
+
+
+class SyncMetrics:
+    """
+    Per-file stage timings and API-call counters for a sync run
+
+    span() times a named stage; GoogleDocsSync.execute() counts requests,
+    payload bytes, retries and quota errors. Everything a thread records
+    goes to the file it is working on (see track()), or to a run-wide
+    record outside any file. report() writes the records as JSON lines
+    and/or prints a summary table.
+    """
+
+    def __init__(self, path=None, profile=False):
+        self.path = path
+        self.profile = profile
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.records = {}
+            self.started = time.perf_counter()
+
+    def _record(self):
+        """The calling thread's current record; call with self.lock held"""
+        key = getattr(self._local, 'file', None) or RUN_RECORD
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = {
+                'file': key, 'stages': {}, 'requests': {}, 'edits': {},
+                'bytes_sent': 0, 'bytes_received': 0,
+                'retries': 0, 'quota_errors': 0, 'errors': 0,
+            }
+        return record
+
+    @contextlib.contextmanager
+    def track(self, file_path):
+        """Attribute everything the calling thread records to file_path"""
+        previous = getattr(self._local, 'file', None)
+        self._local.file = file_path
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time('total', time.perf_counter() - start)
+            self._local.file = previous
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            stages = self._record()['stages']
+            total, count = stages.get(stage, (0.0, 0))
+            stages[stage] = (total + seconds, count + 1)
+
+    def measure(self, request):
+        """
+        Return (bytes sent, list collecting bytes received) for an API request
+        
+        The response size is taken from the raw body as it is decoded.
+        """
+        received = []
+        postproc = request.postproc
+        
+        def measured(resp, content):
+            received.append(len(content or b''))
+            return postproc(resp, content)
+        
+        request.postproc = measured
+        return len(request.body or b''), received
+
+    def count_request(self, method, calls=1, sent=0, received=0):
+        with self.lock:
+            record = self._record()
+            record['requests'][method] = record['requests'].get(method, 0) + calls
+            record['bytes_sent'] += sent
+            record['bytes_received'] += received
+
+    def count_edits(self, requests):
+        """Count batchUpdate requests by type (insertText, deleteContentRange...)"""
+        with self.lock:
+            edits = self._record()['edits']
+            for request in requests:
+                for kind in request:
+                    edits[kind] = edits.get(kind, 0) + 1
+
+    def count_error(self, status, retrying):
+        with self.lock:
+            record = self._record()
+            record['quota_errors'] += status == 429
+            record['retries' if retrying else 'errors'] += 1
+
+    def report(self, command):
+        """Emit what was recorded since the last report, then start afresh"""
+        with self.lock:
+            elapsed = time.perf_counter() - self.started
+            records = []
+            for record in self.records.values():
+                record = dict(record)
+                record['stages'] = {stage: {'seconds': round(seconds, 6), 'count': count}
+                                    for stage, (seconds, count) in record['stages'].items()}
+                records.append(record)
+        self.reset()
+        
+        totals = {'stages': {}, 'requests': {}, 'edits': {}}
+        for record in records:
+            for stage, timing in record['stages'].items():
+                total = totals['stages'].setdefault(stage, {'seconds': 0.0, 'count': 0})
+                total['seconds'] += timing['seconds']
+                total['count'] += timing['count']
+            for key in ('requests', 'edits'):
+                for name, n in record[key].items():
+                    totals[key][name] = totals[key].get(name, 0) + n
+            for key in ('bytes_sent', 'bytes_received', 'retries', 'quota_errors', 'errors'):
+                totals[key] = totals.get(key, 0) + record[key]
+        for timing in totals['stages'].values():
+            timing['seconds'] = round(timing['seconds'], 6)
+        
+        summary = {
+            'type': 'run',
+            'command': command,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'seconds': round(elapsed, 6),
+            'files': sum(1 for record in records if record['file'] != RUN_RECORD),
+            **totals,
+        }
+        
+        if self.path:
+            try:
+                with open(self.path, 'a') as f:
+                    for record in records:
+                        f.write(json.dumps({'type': 'file', 'command': command,
+                                            'timestamp': summary['timestamp'], **record}) + '\n')
+                    f.write(json.dumps(summary) + '\n')
+            except OSError as e:
+                print(f"⚠️  Could not write metrics to {self.path}: {e}")
+        
+        if self.profile:
+            self.print_summary(summary, records)
+
+    def print_summary(self, summary, records):
+        print(f"\n📈 Sync profile: {summary['files']} files in {summary['seconds']:.2f}s")
+        
+        stages = [(stage, timing) for stage, timing in summary['stages'].items() if stage != 'total']
+        
+        # Time spent on files outside any measured stage
+        other = sum(record['stages']['total']['seconds']
+                    - sum(timing['seconds'] for stage, timing in record['stages'].items() if stage != 'total')
+                    for record in records if 'total' in record['stages'])
+        if other > 0:
+            stages.append(('(other)', {'seconds': other, 'count': summary['files']}))
+        
+        stages.sort(key=lambda item: -item[1]['seconds'])
+        if stages:
+            print(f"   {'Stage':<32} {'Time (s)':>9} {'Calls':>7}")
+            for stage, timing in stages:
+                print(f"   {stage:<32} {timing['seconds']:>9.3f} {timing['count']:>7}")
+        
+        if summary['requests']:
+            calls = ', '.join(f"{method}: {n}" for method, n in sorted(summary['requests'].items()))
+            print(f"   🌐 API requests: {sum(summary['requests'].values())} ({calls})")
+            print(f"   📦 Payload: {summary['bytes_sent']:,} bytes sent, {summary['bytes_received']:,} bytes received")
+        if summary['edits']:
+            print(f"   ✂️  Edits: " + ', '.join(f"{kind}: {n}" for kind, n in sorted(summary['edits'].items())))
+        print(f"   🔁 Retries: {summary['retries']}, quota errors (429): {summary['quota_errors']}, "
+              f"failed requests: {summary['errors']}")
+        
+        timed = [(record['stages']['total']['seconds'], record['file']) for record in records
+                 if record['file'] != RUN_RECORD and 'total' in record['stages']]
+        if timed:
+            slowest = ', '.join(f"{file_path} {seconds:.2f}s" for seconds, file_path in sorted(timed, reverse=True)[:3])
+            print(f"   🐢 Slowest files: {slowest}")
+
+
 class GoogleDocsSync:
-    def __init__(self, credentials_file='credentials.json', token_file='token.pickle'):
+    def __init__(self, credentials_file='credentials.json', token_file='token.pickle',
+                 reads_per_minute=DEFAULT_READ_QUOTA_PER_MINUTE,
+                 writes_per_minute=DEFAULT_WRITE_QUOTA_PER_MINUTE, scopes=SCOPES, metrics=None,
+                 drive_requests_per_minute=DEFAULT_DRIVE_QUOTA_PER_MINUTE):
         self.credentials_file = credentials_file
         self.token_file = token_file
+        self.scopes = list(scopes)
+        self.creds = None
         self.service = None
+        self.read_limiter = RateLimiter(reads_per_minute)
+        self.write_limiter = RateLimiter(writes_per_minute)
+        self.drive_limiter = RateLimiter(drive_requests_per_minute)
+        self._local = threading.local()
+        self.revisions = {}
+        self.prefetched = {}
+        self.prefetched_metadata = {}
+        self._executor = None
+        self._executor_workers = 0
+        self.metrics = metrics
+        self.document_index = DocumentIndex()
+        self.template_index = DocumentIndex()
+        load_google_libraries()
         self.authenticate()
     
-    def authenticate(self):
-        """Authenticate with Google Docs API"""
-        creds = None
+    def authenticate(self):
+        """Authenticate with Google Docs API"""
+        creds = None
+        
+        # Check if token file exists
+        if os.path.exists(self.token_file):
+            creds = Credentials.from_authorized_user_file(self.token_file)
+            # A token granted for fewer scopes (e.g. push only) needs new consent.
+            # Ask for the scopes it already has as well, so that commands
+            # needing different scopes (pull, --directory) do not keep re-asking
+            if not creds.has_scopes(self.scopes):
+                self.scopes = sorted(set(self.scopes) | set(creds.scopes or ()))
+                creds = None
+        
+        # If no valid credentials, get new ones
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(self.credentials_file):
+                    print(f"❌ Credentials file not found: {self.credentials_file}")
+                    print("Please download credentials.json from Google Cloud Console")
+                    sys.exit(1)
+                
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_file, self.scopes)
+                creds = flow.run_local_server(port=0)
+            
+            # Save credentials for next run
+            self.save_token(creds)
+        
+        self.creds = creds
+        self.service = build('docs', 'v1', credentials=creds)
+        print("✅ Google Docs authentication successful")
+    
+    def save_token(self, creds):
+        """Save credentials for the next run"""
+        with open(self.token_file, 'w') as token:
+            token.write(creds.to_json())
+    
+    def refresh_credentials(self, margin=TOKEN_REFRESH_MARGIN_SECONDS):
+        """Refresh the access token shortly before it expires, so no sync has to wait for it"""
+        creds = self.creds
+        if not creds or not creds.refresh_token or not creds.expiry:
+            return
+        if creds.expiry - datetime.datetime.utcnow() > datetime.timedelta(seconds=margin):
+            return
+        
+        try:
+            creds.refresh(Request())
+            self.save_token(creds)
+        except Exception as e:
+            print(f"⚠️  Could not refresh Google credentials: {e}")
+    
+    def get_service(self, api='docs'):
+        """
+        Return a Docs (or Drive) service for the calling thread
+        
+        The underlying httplib2 transport is not thread-safe, so worker
+        threads each build their own service from the shared credentials.
+        """
+        if api == 'docs' and threading.current_thread() is threading.main_thread():
+            return self.service
+        
+        services = self._local.__dict__.setdefault('services', {})
+        if api not in services:
+            services[api] = build(api, API_VERSIONS[api], credentials=self.creds)
+        return services[api]
+    
+    def get_resource(self, name='documents', api='docs'):
+        """
+        Return a service collection (e.g. documents) for the calling thread
+        
+        googleapiclient builds a collection anew, docstrings and all, on
+        every service.documents() call, which costs ~80 ms of CPU for Docs.
+        Each thread builds a collection once and reuses it.
+        """
+        resources = self._local.__dict__.setdefault('resources', {})
+        if (api, name) not in resources:
+            resources[(api, name)] = getattr(self.get_service(api), name)()
+        return resources[(api, name)]
+    
+    def span(self, stage):
+        """Time a stage of the current file's sync when metrics are enabled"""
+        return self.metrics.span(stage) if self.metrics else NO_METRICS
+    
+    def track(self, file_path):
+        """Attribute metrics recorded by this thread to file_path"""
+        return self.metrics.track(file_path) if self.metrics else NO_METRICS
+    
+    def execute(self, request, write=True):
+        """
+        Execute an API request under the shared rate limiter
+        
+        Drive calls draw from the Drive limiter, Docs calls from the Docs
+        read or write limiter. Retries 429 and 5xx responses with exponential backoff and full
+        jitter, honouring a Retry-After header when the server sends one.
+        """
+        metrics = self.metrics
+        method = getattr(request, 'methodId', None) or 'request'
+        if method.startswith('drive.'):
+            limiter = self.drive_limiter
+        else:
+            limiter = self.write_limiter if write else self.read_limiter
+        if metrics:
+            sent, received = metrics.measure(request)
+        
+        attempt = 0
+        while True:
+            with self.span('rate_limit_wait'):
+                limiter.acquire()
+            try:
+                with self.span(method):
+                    result = request.execute()
+                if metrics:
+                    metrics.count_request(method, sent=sent, received=sum(received))
+                return result
+            except HttpError as error:
+                status = getattr(error.resp, 'status', None)
+                retrying = status in RETRYABLE_STATUS_CODES and attempt < MAX_RETRIES
+                if metrics:
+                    metrics.count_request(method, sent=sent, received=len(error.content or b''))
+                    metrics.count_error(status, retrying)
+                if not retrying:
+                    raise
+                
+                retry_after = error.resp.get('retry-after') if hasattr(error.resp, 'get') else None
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                
+                attempt += 1
+                print(f"   ⏳ HTTP {status}, retrying in {delay:.1f}s (attempt {attempt}/{MAX_RETRIES})")
+                with self.span('backoff'):
+                    time.sleep(delay)
+    
+    def read_markdown_file(self, file_path):
+        """Read markdown file content"""
+        try:
+            with self.span('read'), open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+            return content
+        except FileNotFoundError:
+            print(f"❌ File not found: {file_path}")
+            return None
+        except Exception as e:
+            print(f"❌ Error reading file {file_path}: {e}")
+            return None
+    
+    def clean_escaped_markdown(self, content):
+        """
+        Clean escaped markdown characters from Google Docs export
+        
+        Google Docs "Download as Markdown" feature escapes markdown syntax,
+        resulting in content like:
+        - \\# Header → # Header
+        - \\- List item → - List item 
+        - \\*emphasis\\* → *emphasis*
+        - \\1. Numbered → 1. Numbered
+        - \\+1-2 → +1-2
+        - project\\_system\\_instructions → project_system_instructions
+        
+        This function gracefully handles both escaped and non-escaped content.
+        """
+        if not content or not ESCAPE_HINT_PATTERN.search(content):
+            return content
+        
+        with self.span('clean'):
+            cleaned_content, detected, changes = unescape_markdown(content)
+        
+        # If no escaped patterns detected, return original content
+        if not detected:
+            return content
+        
+        self.report_cleaning(detected, changes)
+        return cleaned_content
+    
+    def report_cleaning(self, detected, changes):
+        """Print what clean_escaped_markdown found and removed"""
+        print(f"   🔍 Detected {len(detected)} types of escaped markdown patterns")
+        
+        if changes:
+            summary = ', '.join(f"{category}: {n}" for category, n in changes.items())
+            print(f"   🧹 Cleaned {sum(changes.values())} escaped markdown characters ({summary})")
+        else:
+            print(f"   ℹ️  No escaped markdown characters found to clean")
+    
+    def iter_markdown_chunks(self, file_path, chunk_size=STREAM_CHUNK_CHARS, max_chars=STREAM_MAX_BUFFER_CHARS):
+        """
+        Yield (chunk, final, carried) pieces of a markdown file of about chunk_size characters
+        
+        The pieces come from split_markdown_chunks, so unescape_markdown gives
+        the same result chunk by chunk as on the whole file, and memory use is
+        bounded by max_chars plus chunk_size.
+        """
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield from split_markdown_chunks(iter(lambda: file.read(chunk_size), ''), max_chars)
+    
+    def extract_document_text(self, doc):
+        """
+        Extract the plain text of a document body for diffing
+        
+        Returns None when the body holds anything other than plain text
+        paragraphs (tables, inline images, page breaks...) or when the text
+        runs are not contiguous, since index arithmetic on the extracted
+        text would then not match the document.
+        """
+        parts = []
+        next_index = 1
+        
+        for element in doc['body']['content']:
+            if 'sectionBreak' in element:
+                continue
+            if 'paragraph' not in element:
+                return None
+            
+            for run in element['paragraph'].get('elements', []):
+                if 'textRun' not in run or run.get('startIndex') != next_index:
+                    return None
+                text = run['textRun'].get('content', '')
+                parts.append(text)
+                next_index += utf16_length(text)
+        
+        return ''.join(parts)
+    
+    def build_incremental_requests(self, current_text, content):
+        """
+        Build the minimal edit requests turning current_text into content
+        
+        Both sides are diffed line by line without the trailing newline
+        every Docs body ends with (it cannot be deleted). Edits are emitted
+        from the end of the document backwards, so each request's indices
+        are unaffected by the requests before it in the batch.
+        """
+        import difflib
+        
+        old_lines = current_text[:-1].splitlines(keepends=True)
+        new_lines = content.splitlines(keepends=True)
+        
+        # Docs indexes are UTF-16 code unit offsets starting at 1
+        offsets = [1]
+        for line in old_lines:
+            offsets.append(offsets[-1] + utf16_length(line))
+        
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        requests = []
+        
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            
+            if i2 > i1:
+                requests.append({
+                    'deleteContentRange': {
+                        'range': {
+                            'startIndex': offsets[i1],
+                            'endIndex': offsets[i2]
+                        }
+                    }
+                })
+            
+            if j2 > j1:
+                requests.append({
+                    'insertText': {
+                        'location': {'index': offsets[i1]},
+                        'text': ''.join(new_lines[j1:j2])
+                    }
+                })
+        
+        return requests
+    
+    def build_full_replace_requests(self, doc, content):
+        """Build requests replacing the whole document body with content"""
+        requests = []
+        
+        # Clear existing content
+        doc_length = doc['body']['content'][-1]['endIndex'] - 1
+        if doc_length > 1:
+            requests.append({
+                'deleteContentRange': {
+                    'range': {
+                        'startIndex': 1,
+                        'endIndex': doc_length
+                    }
+                }
+            })
+        
+        # Insert new content
+        if content:
+            requests.append({
+                'insertText': {
+                    'location': {'index': 1},
+                    'text': content
+                }
+            })
+        
+        return requests
+    
+    def send_batch(self, doc_id, requests, revision=None):
+        """
+        Send one batchUpdate and return the document's new revisionId
+        
+        With a revision, the update fails rather than clobber edits made
+        since that revision was read.
+        """
+        body = {'requests': requests}
+        if revision:
+            body['writeControl'] = {'requiredRevisionId': revision}
+        if self.metrics:
+            self.metrics.count_edits(requests)
+        
+        result = self.execute(self.get_resource().batchUpdate(documentId=doc_id, body=body))
+        revision = result.get('writeControl', {}).get('requiredRevisionId')
+        self.revisions[doc_id] = revision
+        return revision
+    
+    def send_requests(self, doc_id, requests, revision=None):
+        """
+        Send requests in as few batchUpdates as MAX_BATCH_INSERT_CHARS allows
+        
+        Batches go out in order, each requiring the revision the previous
+        one produced, so indices computed for the whole list stay valid.
+        """
+        batch = []
+        pending_chars = 0
+        for request in requests:
+            chars = len(request.get('insertText', {}).get('text', ''))
+            if batch and pending_chars + chars > MAX_BATCH_INSERT_CHARS:
+                revision = self.send_batch(doc_id, batch, revision)
+                batch = []
+                pending_chars = 0
+            batch.append(request)
+            pending_chars += chars
+        
+        if batch:
+            revision = self.send_batch(doc_id, batch, revision)
+        return revision
+    
+    def fetch_for_update(self, doc_id, expected_revision=None, fields=None):
+        """
+        Get a document before overwriting it
+        
+        With fields (e.g. PREFLIGHT_FIELDS), only those parts of the
+        document are fetched. Returns None if the document has moved on from
+        expected_revision, i.e. it was edited in Google Docs since the last
+        sync.
+        """
+        doc = self.prefetched.pop(doc_id, None)
+        if doc is None:
+            params = {'documentId': doc_id}
+            if fields:
+                params['fields'] = fields
+            doc = self.execute(self.get_resource().get(**params), write=False)
+        
+        if expected_revision and doc.get('revisionId') not in (None, expected_revision):
+            print(f"⚠️  Google Doc {doc_id} was edited since the last sync - use --force to overwrite")
+            return None
+        self.revisions[doc_id] = doc.get('revisionId')
+        return doc
+    
+    def update_google_doc(self, doc_id, content, incremental=True, expected_revision=None,
+                          render=False):
+        """
+        Update Google Doc with markdown content
+        
+        By default only the lines that differ from the current document are
+        rewritten, which keeps revision history and comments on untouched
+        text. Documents that cannot be diffed safely are fully replaced.
+        
+        With render, the markdown is converted to native Docs formatting:
+        the text edits are worked out on the rendered text, and the
+        formatting requests follow them in the same batchUpdate.
+        
+        If expected_revision is given and the document has moved on since,
+        it was edited in Google Docs and is left untouched. The revisionId
+        after the update is stored in self.revisions[doc_id].
+        """
+        try:
+            # Get document to check if it exists; a full replace only needs its length
+            doc = self.fetch_for_update(doc_id, expected_revision, None if incremental else PREFLIGHT_FIELDS)
+            if doc is None:
+                return False
+            
+            format_requests = []
+            if render:
+                with self.span('render'):
+                    content, format_requests = render_markdown(content)
+            
+            requests = None
+            if incremental:
+                current_text = self.extract_document_text(doc)
+                if current_text is not None:
+                    with self.span('diff'):
+                        requests = self.build_incremental_requests(current_text, content)
+                    if not requests and not format_requests:
+                        print(f"   ℹ️  Google Doc already up to date")
+                        return True
+                    if requests:
+                        print(f"   ✂️  Applying {len(requests)} incremental edits")
+            
+            if requests is None:
+                requests = self.build_full_replace_requests(doc, content)
+            
+            if format_requests:
+                print(f"   🎨 Applying {len(format_requests)} formatting requests")
+                requests += format_requests
+            if not requests:
+                return True
+            
+            self.send_requests(doc_id, requests, doc.get('revisionId'))
+            return True
+            
+        except HttpError as error:
+            print(f"❌ Error updating Google Doc {doc_id}: {error}")
+            return False
+        except Exception as e:
+            print(f"❌ Unexpected error updating Google Doc {doc_id}: {e}")
+            return False
+    
+    def stream_google_doc(self, doc_id, file_path, clean_escapes=True, expected_revision=None):
+        """
+        Replace a Google Doc with a large markdown file in bounded memory
+        
+        The file is read in chunks which are cleaned one at a time and
+        inserted back to back, as many inserts per batchUpdate as fit in
+        MAX_BATCH_INSERT_CHARS. Each batch requires the revision produced by
+        the previous one, so a concurrent edit stops the upload.
+        """
+        try:
+            # Only the body's length is needed, however large the document
+            doc = self.fetch_for_update(doc_id, expected_revision, PREFLIGHT_FIELDS)
+            if doc is None:
+                return False
+            
+            # Whether to clean is decided on the whole file, as in
+            # clean_escaped_markdown: the first chunk with an escape settles
+            # it, and chunks that cannot hold one are only searched
+            with self.span('clean'):
+                escaped = clean_escapes and any(
+                    ESCAPE_HINT_PATTERN.search(chunk) and unescape_markdown(chunk, final, carried)[1]
+                    for chunk, final, carried in self.iter_markdown_chunks(file_path))
+            
+            revision = doc.get('revisionId')
+            requests = self.build_full_replace_requests(doc, '')
+            index = 1
+            pending_chars = 0
+            batches = 0
+            detected = set()
+            changes = {}
+            
+            for chunk, final, carried in self.iter_markdown_chunks(file_path):
+                if escaped:
+                    with self.span('clean'):
+                        chunk, chunk_detected, chunk_changes = unescape_markdown(chunk, final, carried)
+                    detected |= chunk_detected
+                    for category, n in chunk_changes.items():
+                        changes[category] = changes.get(category, 0) + n
+                if not chunk:
+                    continue
+                
+                requests.append({
+                    'insertText': {
+                        'location': {'index': index},
+                        'text': chunk
+                    }
+                })
+                index += utf16_length(chunk)
+                pending_chars += len(chunk)
+                
+                if pending_chars >= MAX_BATCH_INSERT_CHARS:
+                    revision = self.send_batch(doc_id, requests, revision)
+                    batches += 1
+                    requests = []
+                    pending_chars = 0
+            
+            if requests:
+                self.send_batch(doc_id, requests, revision)
+                batches += 1
+            
+            if escaped:
+                self.report_cleaning(detected, changes)
+            print(f"   📦 Streamed {index - 1} characters in {batches} batch updates")
+            return True
+            
+        except HttpError as error:
+            print(f"❌ Error updating Google Doc {doc_id}: {error}")
+            return False
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"❌ Error reading file {file_path}: {e}")
+            return False
+        except Exception as e:
+            print(f"❌ Unexpected error updating Google Doc {doc_id}: {e}")
+            return False
+    
+    def sync_file(self, file_path, doc_id, clean_escapes=True, incremental=True,
+                  manifest=None, force=False, render=False):
+        """
+        Sync a single file to Google Docs
+        
+        When a manifest is given, files unchanged since their last recorded
+        push are skipped without any API call, and documents edited in
+        Google Docs since then are not overwritten. force bypasses both.
+        """
+        plan = self.plan_sync(file_path, doc_id, clean_escapes, manifest, force, render)
+        if plan is None:
+            return True
+        return self.push_file(plan, clean_escapes, incremental, manifest, render)
+    
+    def plan_sync(self, file_path, doc_id, clean_escapes=True, manifest=None, force=False,
+                  render=False):
+        """
+        Decide locally whether a file needs pushing
+        
+        Returns None when the manifest shows the file unchanged since its
+        last push, otherwise the plan push_file() carries out.
+        """
+        entry = manifest.get(file_path) if manifest and not force else None
+        if entry and ((entry.get('doc_id'), entry.get('clean_escapes'), entry.get('render', False))
+                      != (doc_id, clean_escapes, render)):
+            entry = None
+        
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            stat = None
+        
+        # Cheap check first: same size and mtime means the file was not touched
+        if entry and stat and (entry.get('size'), entry.get('mtime_ns')) == (stat.st_size, stat.st_mtime_ns):
+            print(f"⏭️  Unchanged, skipping {file_path}")
+            return None
+        
+        try:
+            with self.span('hash'):
+                content_hash = file_sha256(file_path) if stat else None
+        except OSError:
+            content_hash = None
+        
+        if entry and content_hash and entry.get('sha256') == content_hash:
+            print(f"⏭️  Content unchanged, skipping {file_path}")
+            manifest.record(file_path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return None
+        
+        return {
+            'file_path': file_path,
+            'doc_id': doc_id,
+            'stat': stat,
+            'content_hash': content_hash,
+            'expected_revision': entry.get('revision_id') if entry else None,
+        }
+    
+    def push_file(self, plan, clean_escapes=True, incremental=True, manifest=None, render=False):
+        """Push a file planned by plan_sync() to its Google Doc"""
+        file_path, doc_id, stat = plan['file_path'], plan['doc_id'], plan['stat']
+        expected_revision = plan['expected_revision']
+        print(f"📄 Syncing {file_path} to Google Doc {doc_id[:8]}...")
+        
+        # Very large files are streamed rather than diffed in memory
+        if stat and stat.st_size >= STREAM_THRESHOLD_BYTES:
+            if render:
+                print(f"   ⚠️  Streamed files are pushed as plain markdown, without formatting")
+            success = self.stream_google_doc(doc_id, file_path, clean_escapes, expected_revision)
+        else:
+            content = self.read_markdown_file(file_path)
+            if content is None:
+                return False
+            
+            # Clean escaped markdown characters if requested
+            if clean_escapes:
+                content = self.clean_escaped_markdown(content)
+            
+            success = self.update_google_doc(doc_id, content, incremental, expected_revision, render)
+        if success:
+            print(f"✅ Successfully synced {file_path}")
+            if manifest and plan['content_hash']:
+                manifest.record(file_path, doc_id=doc_id, clean_escapes=clean_escapes, render=render,
+                                sha256=plan['content_hash'], size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                revision_id=self.revisions.get(doc_id))
+        else:
+            print(f"❌ Failed to sync {file_path}")
+        
+        return success
+    
+    def preflight_documents(self, doc_ids, full=True, partial=()):
+        """
+        Fetch many documents up front in a few HTTP batch requests
+        
+        Each BatchHttpRequest carries up to PREFLIGHT_BATCH_SIZE
+        documents().get calls in one round trip. Fetched documents are kept
+        in self.prefetched for fetch_for_update(); with full=False (and for
+        IDs in partial, e.g. documents that will be streamed) only the
+        fields needed to check existence, length and revision are fetched.
+        
+        Returns {doc_id: error message} for IDs that are malformed, missing
+        or inaccessible. Rate limited or failed lookups are left for the
+        update phase to retry.
+        """
+        invalid = {}
+        pending = []
+        for doc_id in dict.fromkeys(doc_ids):
+            if DOC_ID_PATTERN.fullmatch(doc_id):
+                pending.append(doc_id)
+            else:
+                invalid[doc_id] = "not a Google Doc ID"
+        
+        def on_response(doc_id, response, exception):
+            if exception is None:
+                self.prefetched[doc_id] = response
+            elif getattr(getattr(exception, 'resp', None), 'status', None) in (400, 403, 404):
+                invalid[doc_id] = "not found or not accessible"
+        
+        service = self.get_service()
+        documents = self.get_resource()
+        batches = 0
+        for start in range(0, len(pending), PREFLIGHT_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_response)
+            chunk = pending[start:start + PREFLIGHT_BATCH_SIZE]
+            for doc_id in chunk:
+                params = {'documentId': doc_id}
+                if not full or doc_id in partial:
+                    params['fields'] = PREFLIGHT_FIELDS
+                # Every call inside a batch still counts against the quota
+                self.read_limiter.acquire()
+                batch.add(documents.get(**params), request_id=doc_id)
+            try:
+                with self.span('preflight'):
+                    batch.execute()
+                batches += 1
+                if self.metrics:
+                    self.metrics.count_request('batch')
+                    self.metrics.count_request('docs.documents.get', calls=len(chunk))
+            except HttpError as error:
+                print(f"⚠️  Pre-flight batch failed, documents will be checked one by one: {error}")
+        
+        if batches:
+            print(f"🔎 Pre-flight checked {len(pending)} documents in {batches} batch requests")
+        return invalid
+    
+    def validate_documents(self, file_paths, config_file):
+        """
+        Check documents before syncing, as the project's .madio config asks
+        
+        With validation.checkCrossReferences, every markdown link and
+        backticked .md mention must point at an existing document (and
+        heading or anchor); with validation.validatePlaceholders, no
+        [PLACEHOLDER] token may be left, nor any bracketed text the template
+        library (framework.templateLibrary) uses, while it is still there.
+        Returns False if a check fails.
+        """
+        madio_path = find_madio_config(os.path.dirname(os.path.abspath(config_file)))
+        if madio_path is None:
+            return True
+        
+        try:
+            with open(madio_path, 'r') as f:
+                madio = json.load(f)
+            settings = madio.get('validation') or {}
+            library = os.path.join(os.path.dirname(madio_path),
+                                   (madio.get('framework') or {}).get('templateLibrary') or TEMPLATE_LIBRARY_DIRNAME)
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(f"⚠️  Could not read validation settings from {madio_path}: {e}")
+            return True
+        
+        check_references = settings.get('checkCrossReferences') is True
+        check_placeholders = settings.get('validatePlaceholders') is True
+        if not (check_references or check_placeholders):
+            return True
+        
+        start = time.perf_counter()
+        with self.span('validate'):
+            known = self.template_placeholders(library) if check_placeholders else frozenset()
+            issues, rescanned = self.document_index.validate(
+                file_paths, os.path.dirname(madio_path), check_references, check_placeholders, known)
+        print(f"🔎 Validated {len(file_paths)} documents ({rescanned} re-scanned) "
+              f"in {time.perf_counter() - start:.2f}s")
+        
+        if not issues:
+            return True
+        
+        for path, line, message in issues[:MAX_REPORTED_ISSUES]:
+            print(f"   ❌ {path}:{line}: {message}")
+        if len(issues) > MAX_REPORTED_ISSUES:
+            print(f"   ... and {len(issues) - MAX_REPORTED_ISSUES} more")
+        print(f"❌ Validation failed with {len(issues)} issues - fix them or use --no-validate")
+        return False
+    
+    def template_placeholders(self, directory):
+        """
+        Bracketed texts of the template library in directory, as placeholders
+        
+        Templates use descriptive placeholders ([Usage quote example]) as
+        well as [ALL_CAPS] ones. The library is usually removed once the
+        project documents are generated, which leaves only [ALL_CAPS] tokens
+        to be caught.
+        """
+        if not os.path.isdir(directory):
+            return frozenset()
+        paths = [os.path.join(directory, path) for path in discover_markdown_files(directory)]
+        issues, _ = self.template_index.validate(paths, directory, check_references=False,
+                                                 check_placeholders=False)
+        for path, _, message in issues:
+            print(f"⚠️  Skipping template {path}: {message}")
+        return self.template_index.bracketed()
+    
+    def load_sync_jobs(self, config_file, base_dir=None):
+        """
+        Return the (file_path, doc_id) pairs mapped in a config file, or None if unreadable
+        
+        With base_dir, mapped paths are relative to it rather than to the
+        working directory.
+        """
+        if not os.path.exists(config_file):
+            print(f"❌ Config file not found: {config_file}")
+            return None
+        
+        try:
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"❌ Invalid JSON in config file: {e}")
+            return None
+        
+        jobs = []
+        for file_path, doc_id in config.items():
+            # Skip configuration comments
+            if file_path.startswith('_'):
+                continue
+                
+            if doc_id in PROVISION_PLACEHOLDERS:
+                print(f"⚠️  Skipping {file_path} - no Google Doc ID configured")
+                continue
+            
+            if base_dir is not None:
+                file_path = os.path.join(base_dir, file_path)
+            jobs.append((file_path, doc_id))
+        
+        return jobs
+    
+    def get_executor(self, workers):
+        """
+        Return a pool of `workers` threads
+        
+        The pool outlives a single run so that its threads keep their
+        services, and with them their open connections, between syncs.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if self._executor is None or self._executor_workers != workers:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync')
+            self._executor_workers = workers
+        return self._executor
+    
+    def run_jobs(self, jobs, action, workers=1):
+        """Run action(file_path, doc_id) for each job, on a thread pool if workers > 1"""
+        from concurrent.futures import as_completed
+        
+        def run(file_path, doc_id):
+            with self.track(file_path):
+                return action(file_path, doc_id)
+        
+        results = {}
+        if workers > 1 and len(jobs) > 1:
+            print(f"⚡ Processing {len(jobs)} files with {workers} workers")
+            executor = self.get_executor(workers)
+            futures = {
+                executor.submit(run, file_path, doc_id): file_path
+                for file_path, doc_id in jobs
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    results[file_path] = future.result()
+                except Exception as e:
+                    print(f"❌ Unexpected error processing {file_path}: {e}")
+                    results[file_path] = False
+        else:
+            for file_path, doc_id in jobs:
+                results[file_path] = run(file_path, doc_id)
+        
+        return results
+    
+    def resolve_drive_folder(self, folder):
+        """
+        Return the Drive folder ID for a _google_drive_folder config block
         
-        # Check if token file exists
-        if os.path.exists(self.token_file):
-            creds = Credentials.from_authorized_user_file(self.token_file, SCOPES)
+        An empty name means My Drive itself. A named folder is looked up in
+        My Drive and created if missing; its ID is stored in the block so
+        later runs skip the lookup.
+        """
+        if folder.get('id'):
+            return folder['id']
         
-        # If no valid credentials, get new ones
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+        files = self.get_resource('files', 'drive')
+        name = folder.get('name')
+        if not name:
+            return self.execute(files.get(fileId='root', fields='id'), write=False)['id']
+        
+        query = (f"name = {drive_query_string(name)} and mimeType = '{GOOGLE_FOLDER_MIME_TYPE}' "
+                 f"and 'root' in parents and trashed = false")
+        found = self.execute(files.list(q=query, fields='files(id)', pageSize=1,
+                                                spaces='drive'), write=False).get('files', [])
+        if found:
+            folder['id'] = found[0]['id']
+        else:
+            body = {'name': name, 'mimeType': GOOGLE_FOLDER_MIME_TYPE, 'parents': ['root']}
+            folder['id'] = self.execute(files.create(body=body, fields='id'))['id']
+            print(f"📁 Created Google Drive folder: {name}")
+        return folder['id']
+    
+    def list_drive_folder(self, index, folder_id):
+        """Record every subfolder and Google Doc directly inside folder_id"""
+        files = self.get_resource('files', 'drive')
+        query = (f"{drive_query_string(folder_id)} in parents and trashed = false and "
+                 f"(mimeType = '{GOOGLE_DOC_MIME_TYPE}' or mimeType = '{GOOGLE_FOLDER_MIME_TYPE}')")
+        page_token = None
+        while True:
+            response = self.execute(files.list(
+                q=query, fields=DRIVE_LIST_FIELDS, pageSize=1000, pageToken=page_token,
+                spaces='drive', supportsAllDrives=True, includeItemsFromAllDrives=True), write=False)
+            for file in response.get('files', []):
+                index.add_file(file, folder_id)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+        index.entries[folder_id]['listed'] = True
+    
+    def refresh_drive_index(self, index, root_id):
+        """
+        Bring the folder index up to date with Drive
+        
+        A new index takes a changes start token and lists the root folder.
+        After that, only the changes made since the stored token are read.
+        """
+        feed = self.get_resource('changes', 'drive')
+        if index.root != root_id or not index.token or root_id not in index.entries:
+            index.reset(root_id)
+            index.token = self.execute(feed.getStartPageToken(supportsAllDrives=True),
+                                       write=False)['startPageToken']
+            self.list_drive_folder(index, root_id)
+            return
+        
+        changes = []
+        page_token = index.token
+        while page_token:
+            response = self.execute(feed.list(
+                pageToken=page_token, fields=DRIVE_CHANGES_FIELDS, pageSize=1000, spaces='drive',
+                supportsAllDrives=True, includeItemsFromAllDrives=True), write=False)
+            changes.extend(response.get('changes', []))
+            index.token = response.get('newStartPageToken', index.token)
+            page_token = response.get('nextPageToken')
+        if changes:
+            index.apply_changes(changes)
+            print(f"🔄 Applied {len(changes)} Google Drive changes to the folder index")
+    
+    def ensure_drive_folder(self, index, parts):
+        """Return the ID of the folder at path parts below the index root, creating it as needed"""
+        files = self.get_resource('files', 'drive')
+        parent = index.root
+        for depth, name in enumerate(parts):
+            if not index.entries[parent]['listed']:
+                self.list_drive_folder(index, parent)
+            folder_id = index.find(parent, name, folder=True)
+            if folder_id is None:
+                body = {'name': name, 'mimeType': GOOGLE_FOLDER_MIME_TYPE, 'parents': [parent]}
+                folder_id = self.execute(files.create(
+                    body=body, fields='id', supportsAllDrives=True))['id']
+                index.add(folder_id, name, parent, folder=True, listed=True)
+                print(f"📁 Created Google Drive folder: {'/'.join(parts[:depth + 1])}")
+            parent = folder_id
+        if not index.entries[parent]['listed']:
+            self.list_drive_folder(index, parent)
+        return parent
+    
+    def create_document_batch(self, items):
+        """Create one HTTP batch of Google Docs; returns {key: doc_id} for those created"""
+        drive = self.get_service('drive')
+        files = self.get_resource('files', 'drive')
+        created = {}
+        retry = []
+        
+        def on_response(key, response, exception):
+            if exception is None:
+                created[key] = response['id']
+            elif getattr(getattr(exception, 'resp', None), 'status', None) in RETRYABLE_STATUS_CODES:
+                retry.append(key)
             else:
-                if not os.path.exists(self.credentials_file):
-                    print(f"❌ Credentials file not found: {self.credentials_file}")
-                    print("Please download credentials.json from Google Cloud Console")
-                    sys.exit(1)
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save credentials for next run
-            with open(self.token_file, 'w') as token:
-                token.write(creds.to_json())
+                print(f"❌ Could not create Google Doc for {key}: {exception}")
         
-        self.service = build('docs', 'v1', credentials=creds)
-        print("✅ Google Docs authentication successful")
+        def create_request(parent, title):
+            body = {'name': title, 'mimeType': GOOGLE_DOC_MIME_TYPE, 'parents': [parent]}
+            return files.create(body=body, fields='id', supportsAllDrives=True)
+        
+        batch = drive.new_batch_http_request(callback=on_response)
+        for key, parent, title in items:
+            # Every call inside a batch still counts against the quota
+            self.drive_limiter.acquire()
+            batch.add(create_request(parent, title), request_id=key)
+        try:
+            with self.span('create'):
+                batch.execute()
+            if self.metrics:
+                self.metrics.count_request('batch')
+                self.metrics.count_request('drive.files.create', calls=len(items))
+        except HttpError as error:
+            print(f"⚠️  Document creation batch failed, creating documents one by one: {error}")
+            retry = [key for key, _, _ in items if key not in created]
+        
+        # Rate limited calls get the usual backoff, one at a time
+        for key, parent, title in items:
+            if key in retry:
+                try:
+                    created[key] = self.execute(create_request(parent, title))['id']
+                except HttpError as error:
+                    print(f"❌ Could not create Google Doc for {key}: {error}")
+        return created
     
-    def read_markdown_file(self, file_path):
-        """Read markdown file content"""
+    def create_documents(self, items, workers=1):
+        """
+        Create a Google Doc for each (key, parent_id, title) item
+        
+        Creations are sent as Drive HTTP batch requests of up to
+        DRIVE_BATCH_SIZE, several batches at a time with workers > 1.
+        Returns {key: doc_id} for the documents created.
+        """
+        batches = [items[start:start + DRIVE_BATCH_SIZE]
+                   for start in range(0, len(items), DRIVE_BATCH_SIZE)]
+        created = {}
+        if workers > 1 and len(batches) > 1:
+            for result in self.get_executor(workers).map(self.create_document_batch, batches):
+                created.update(result)
+        else:
+            for batch in batches:
+                created.update(self.create_document_batch(batch))
+        return created
+    
+    def provision_documents(self, config_file, workers=1, mirror_tree=False):
+        """
+        Create Google Docs for files mapped to CREATE_NEW_DOCUMENT or
+        REPLACE_WITH_GOOGLE_DOC_ID
+        
+        Docs go into the folder described by the config's _google_drive_folder
+        block (My Drive if there is none); with mirror_tree, into subfolders
+        matching each file's relative path. A Doc of the same name already in
+        its target folder is reused rather than duplicated, unless another
+        entry of the config already maps to it or several pending files would
+        share it. New IDs are written back to the config file atomically.
+        Returns False if any document could not be created.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            return content
-        except FileNotFoundError:
-            print(f"❌ File not found: {file_path}")
-            return None
-        except Exception as e:
-            print(f"❌ Error reading file {file_path}: {e}")
-            return None
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            # load_sync_jobs reports unreadable configs
+            return True
+        
+        pending = [key for key, value in config.items()
+                   if not key.startswith('_') and isinstance(value, str) and value in PROVISION_PLACEHOLDERS]
+        if not pending:
+            return True
+        
+        folder = config.get('_google_drive_folder')
+        if not isinstance(folder, dict):
+            folder = config['_google_drive_folder'] = {'name': '', 'id': ''}
+        index = DriveFolderIndex(os.path.join(os.path.dirname(config_file), DRIVE_INDEX_FILENAME))
+        
+        # A Doc already mapped to another file is never taken over by name
+        claimed = {value for key, value in config.items()
+                   if not key.startswith('_') and isinstance(value, str) and value not in PROVISION_PLACEHOLDERS}
+        
+        print(f"📁 Setting up Google Drive folder {folder.get('name') or 'My Drive'}...")
+        targets = []
+        items = []
+        reused = 0
+        try:
+            with self.span('provision'):
+                root = self.resolve_drive_folder(folder)
+                self.refresh_drive_index(index, root)
+                if root not in index.entries:
+                    print("⚠️  Google Drive folder was removed - setting it up again")
+                    folder['id'] = ''
+                    root = self.resolve_drive_folder(folder)
+                    self.refresh_drive_index(index, root)
+                
+                for key in pending:
+                    parts = [part for part in key.replace(os.sep, '/').split('/') if part not in ('', '.')]
+                    parent = self.ensure_drive_folder(index, parts[:-1] if mirror_tree else [])
+                    targets.append((key, parent, os.path.splitext(parts[-1])[0]))
+                
+                # Files that would share a title in one folder (same stem in a
+                # flat folder) each get a Doc of their own
+                titles = collections.Counter((parent, title) for _, parent, title in targets)
+                for key, parent, title in targets:
+                    existing = index.find(parent, title, folder=False)
+                    if existing and existing not in claimed and titles[(parent, title)] == 1:
+                        config[key] = existing
+                        claimed.add(existing)
+                        reused += 1
+                    else:
+                        items.append((key, parent, title))
+        except HttpError as error:
+            print(f"❌ Could not set up Google Drive folder: {error}")
+            return False
+        
+        if items:
+            print(f"📄 Creating {len(items)} Google Docs...")
+            created = self.create_documents(items, workers)
+        else:
+            created = {}
+        for key, parent, title in items:
+            if key in created:
+                config[key] = created[key]
+                index.add(created[key], title, parent, folder=False)
+                print(f"   ✅ Created {key}: https://docs.google.com/document/d/{created[key]}/edit")
+        
+        try:
+            write_file_atomic(config_file, json.dumps(config, indent=2) + '\n')
+            index.save()
+        except OSError as e:
+            print(f"❌ Could not write new document IDs to {config_file}: {e}")
+            return False
+        
+        if reused:
+            print(f"🔗 Reused {reused} existing Google Docs with matching names")
+        print(f"💾 Updated mapping file: {config_file}")
+        return len(created) + reused == len(pending)
     
-    def clean_escaped_markdown(self, content):
+    def sync_directory(self, directory, folder_name=DEFAULT_DRIVE_FOLDER_NAME, clean_escapes=True,
+                       workers=1, incremental=True, force=False, validate=True, render=False):
         """
-        Clean escaped markdown characters from Google Docs export
+        Sync every markdown file under a directory, creating Docs as needed
         
-        Google Docs "Download as Markdown" feature escapes markdown syntax,
-        resulting in content like:
-        - \\# Header → # Header
-        - \\- List item → - List item 
-        - \\*emphasis\\* → *emphasis*
-        - \\1. Numbered → 1. Numbered
-        - \\+1-2 → +1-2
-        - project\\_system\\_instructions → project_system_instructions
+        The directory's own mapping file (DIRECTORY_MAPPING_FILENAME) holds
+        the doc IDs, keyed by path relative to the directory. Newly found
+        files are added to it, deleted ones dropped, and the Drive folder
+        tree mirrors the directory tree.
+        """
+        if not os.path.isdir(directory):
+            print(f"❌ Directory not found: {directory}")
+            return False
         
-        This function gracefully handles both escaped and non-escaped content.
+        mapping_file = os.path.join(directory, DIRECTORY_MAPPING_FILENAME)
+        mapping = {}
+        if os.path.exists(mapping_file):
+            try:
+                with open(mapping_file, 'r') as f:
+                    mapping = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON in mapping file {mapping_file}: {e}")
+                return False
+        
+        files = discover_markdown_files(directory)
+        print(f"📂 Found {len(files)} markdown files in {directory}")
+        
+        updated = {key: value for key, value in mapping.items() if key.startswith('_') or key in files}
+        updated.setdefault('_google_drive_folder', {'name': folder_name, 'id': ''})
+        for file_path in files:
+            updated.setdefault(file_path, 'CREATE_NEW_DOCUMENT')
+        if updated != mapping or not os.path.exists(mapping_file):
+            try:
+                write_file_atomic(mapping_file, json.dumps(updated, indent=2) + '\n')
+            except OSError as e:
+                print(f"❌ Could not write mapping file {mapping_file}: {e}")
+                return False
+        
+        return self.sync_all_files(mapping_file, clean_escapes, workers=workers, incremental=incremental,
+                                   force=force, validate=validate, render=render, base_dir=directory)
+    
+    def sync_all_files(self, config_file='sync_config.json', clean_escapes=True, workers=1,
+                       incremental=True, force=False, validate=True, render=False, base_dir=None):
         """
-        import re
+        Sync all files based on configuration
         
-        if not content:
-            return content
-            
-        # First, check if content appears to be escaped (heuristic)
-        escaped_indicators = [
-            r'\\#',          # Escaped headers
-            r'\\-\s',        # Escaped lists  
-            r'\\\*.*\\\*',   # Escaped emphasis
-            r'\\\d+\.',      # Escaped numbered lists
-            r'\\>',          # Escaped blockquotes
-            r'\\\[.*\\\]',   # Escaped links
-            r'\\\+',         # Escaped plus signs
-            r'\\\_',         # Escaped underscores in text
-            r'\\\s*$',       # Trailing standalone backslashes
-        ]
-        
-        # Count potential escaped markdown patterns
-        escape_count = 0
-        for indicator in escaped_indicators:
-            if re.search(indicator, content):
-                escape_count += 1
+        Files mapped to CREATE_NEW_DOCUMENT or REPLACE_WITH_GOOGLE_DOC_ID
+        first get a new Google Doc (see provision_documents). With base_dir,
+        mapped paths are relative to base_dir and new Docs mirror its tree.
         
-        # If no escaped patterns detected, return original content
-        if escape_count == 0:
-            return content
-            
-        # Report detection
-        print(f"   🔍 Detected {escape_count} types of escaped markdown patterns")
+        With workers > 1, files are synced concurrently on a thread pool.
+        All workers share the read/write rate limiters, so the total request
+        rate stays within the per-user Docs API quota.
         
-        # Pattern to match escaped markdown characters
-        # Matches: \# \* \- \+ \. \1 \2 etc.
-        # Ordered by specificity to avoid conflicts
-        patterns = [
-            # Headers: \# \## \### etc. (handle escaped consecutive hashes)
-            (r'\\(#{1,6})', r'\1'),
-            
-            # Lists: \- \* \+ at start of line or after whitespace
-            (r'(^|\s)\\([-*+])\s', r'\1\2 '),
-            
-            # Numbered lists: \1. \2. etc. (both at start of line and mid-text)
-            (r'(^|\s)\\(\d+)\.', r'\1\2.'),
-            (r'\\(\d+)\.', r'\1.'),  # Catch remaining escaped numbers with dots
-            
-            # Escaped plus signs: \+1-2 → +1-2
-            (r'\\(\+)', r'\1'),
-            
-            # Escaped underscores in text: project\_system\_instructions → project_system_instructions
-            (r'\\(_)', r'\1'),
-            
-            # Emphasis: \*text\* \_text\_ (but not legitimate double backslashes)
-            (r'(?<!\\)\\([*_])', r'\1'),
-            
-            # Inline code: \`code\`
-            (r'(?<!\\)\\(`)', r'\1'),
-            
-            # Links: \[text\]\(url\) (but preserve legitimate escapes)
-            (r'(?<!\\)\\([\[\]])', r'\1'),
-            (r'(?<!\\)\\([()])', r'\1'),
-            
-            # Horizontal rules: \--- \***
-            (r'(?<!\\)\\([-*]{3,})', r'\1'),
-            
-            # Blockquotes: \> 
-            (r'(^|\s)\\(>)\s', r'\1\2 '),
-            
-            # Trailing standalone backslashes (common in Google Docs exports)
-            (r'\\\s*$', r''),
-            
-            # Escaped periods in general text (not just numbered lists)
-            (r'(?<!\\)\\(\.)', r'\1'),
-        ]
+        A sync manifest next to the config file records each push so that
+        unchanged files are skipped on later runs (unless force is set).
+        
+        With validate, nothing is pushed unless the documents pass the
+        checks enabled in the project's .madio config. With render, markdown
+        is pushed as native Docs formatting (see render_markdown).
+        """
+        provisioned = self.provision_documents(config_file, workers, mirror_tree=base_dir is not None)
+        jobs = self.load_sync_jobs(config_file, base_dir)
+        if jobs is None:
+            return False
         
-        cleaned_content = content
-        changes_made = 0
+        existing = []
+        for file_path, doc_id in jobs:
+            if not os.path.exists(file_path):
+                print(f"⚠️  File not found: {file_path}")
+                continue
+            existing.append((file_path, doc_id))
+        jobs = existing
         
-        for pattern, replacement in patterns:
-            before_length = len(cleaned_content)
-            cleaned_content = re.sub(pattern, replacement, cleaned_content, flags=re.MULTILINE)
-            after_length = len(cleaned_content)
-            
-            if before_length != after_length:
-                changes_made += 1
+        if validate and not self.validate_documents([file_path for file_path, _ in jobs], config_file):
+            return False
         
-        # Report cleanup results
-        if changes_made > 0:
-            print(f"   🧹 Cleaned {changes_made} types of escaped markdown characters")
-        else:
-            print(f"   ℹ️  No escaped markdown characters found to clean")
+        manifest = SyncManifest(os.path.join(os.path.dirname(config_file), MANIFEST_FILENAME))
         
-        return cleaned_content
+        plans = {}
+        for file_path, doc_id in jobs:
+            with self.track(file_path):
+                plan = self.plan_sync(file_path, doc_id, clean_escapes, manifest, force, render)
+            if plan is not None:
+                plans[file_path] = plan
+        
+        # Resolve every document before the first write; streamed ones never need their body
+        streamed = {plan['doc_id'] for plan in plans.values()
+                    if plan['stat'] and plan['stat'].st_size >= STREAM_THRESHOLD_BYTES}
+        invalid = self.preflight_documents([plan['doc_id'] for plan in plans.values()],
+                                           full=incremental, partial=streamed)
+        for doc_id, reason in invalid.items():
+            print(f"❌ Google Doc {doc_id}: {reason}")
+        
+        def sync_one(file_path, doc_id):
+            plan = plans.get(file_path)
+            if plan is None:
+                return True
+            if doc_id in invalid:
+                print(f"❌ Failed to sync {file_path}")
+                return False
+            return self.push_file(plan, clean_escapes, incremental, manifest, render)
+        
+        results = self.run_jobs(jobs, sync_one, workers)
+        self.prefetched.clear()
+        
+        try:
+            manifest.save()
+        except OSError as e:
+            print(f"⚠️  Could not save sync manifest {manifest.path}: {e}")
+        
+        success_count = sum(1 for success in results.values() if success)
+        total_count = len(jobs)
+        
+        print(f"\n📊 Sync complete: {success_count}/{total_count} files synced successfully")
+        return provisioned and success_count == total_count
     
-    def update_google_doc(self, doc_id, content):
-        """Update Google Doc with markdown content"""
+    def export_google_doc(self, doc_id, cache=None):
+        """
+        Export a Google Doc as markdown through the Drive API
+        
+        Only the file's metadata is fetched when the cache already holds an
+        export of the current version. Returns None on error.
+        """
         try:
-            # Get document to check if it exists
-            doc = self.service.documents().get(documentId=doc_id).execute()
-            
-            # Clear existing content
-            doc_length = doc['body']['content'][-1]['endIndex'] - 1
-            if doc_length > 0:
-                requests = [{
-                    'deleteContentRange': {
-                        'range': {
-                            'startIndex': 1,
-                            'endIndex': doc_length
-                        }
-                    }
-                }]
-                self.service.documents().batchUpdate(
-                    documentId=doc_id, body={'requests': requests}).execute()
-            
-            # Insert new content
-            requests = [{
-                'insertText': {
-                    'location': {'index': 1},
-                    'text': content
-                }
-            }]
+            files = self.get_resource('files', 'drive')
+            metadata = self.prefetched_metadata.pop(doc_id, None)
+            if metadata is None:
+                metadata = self.execute(files.get(
+                    fileId=doc_id, fields=EXPORT_METADATA_FIELDS, supportsAllDrives=True), write=False)
+            version = metadata.get('version')
             
-            result = self.service.documents().batchUpdate(
-                documentId=doc_id, body={'requests': requests}).execute()
+            content = cache.load(doc_id, version) if cache else None
+            if content is not None:
+                print(f"   💾 Using cached export of {doc_id[:8]}... (unchanged since {metadata.get('modifiedTime')})")
+                return content
             
-            return True
+            data = self.execute(files.export(fileId=doc_id, mimeType=EXPORT_MIME_TYPE), write=False)
+            content = data.decode('utf-8') if isinstance(data, bytes) else data
+            if cache:
+                cache.store(doc_id, version, metadata.get('modifiedTime'), content)
+            return content
             
         except HttpError as error:
-            print(f"❌ Error updating Google Doc {doc_id}: {error}")
-            return False
+            print(f"❌ Error exporting Google Doc {doc_id}: {error}")
+            return None
         except Exception as e:
-            print(f"❌ Unexpected error updating Google Doc {doc_id}: {e}")
-            return False
+            print(f"❌ Unexpected error exporting Google Doc {doc_id}: {e}")
+            return None
     
-    def sync_file(self, file_path, doc_id, clean_escapes=True):
-        """Sync a single file to Google Docs"""
-        print(f"📄 Syncing {file_path} to Google Doc {doc_id[:8]}...")
+    def prefetch_file_metadata(self, doc_ids):
+        """
+        Look up the Drive version of many files in a few HTTP batch requests
+        
+        Results are kept in self.prefetched_metadata for export_google_doc(),
+        so a document served from the export cache costs no request of its
+        own. Failed lookups are left for export_google_doc() to retry.
+        """
+        pending = [doc_id for doc_id in dict.fromkeys(doc_ids) if DOC_ID_PATTERN.fullmatch(doc_id)]
+        
+        def on_response(doc_id, response, exception):
+            if exception is None:
+                self.prefetched_metadata[doc_id] = response
+        
+        drive = self.get_service('drive')
+        files = self.get_resource('files', 'drive')
+        batches = 0
+        for start in range(0, len(pending), PREFLIGHT_BATCH_SIZE):
+            batch = drive.new_batch_http_request(callback=on_response)
+            chunk = pending[start:start + PREFLIGHT_BATCH_SIZE]
+            for doc_id in chunk:
+                # Every call inside a batch still counts against the quota
+                self.drive_limiter.acquire()
+                batch.add(files.get(fileId=doc_id, fields=EXPORT_METADATA_FIELDS, supportsAllDrives=True),
+                          request_id=doc_id)
+            try:
+                with self.span('metadata'):
+                    batch.execute()
+                batches += 1
+                if self.metrics:
+                    self.metrics.count_request('batch')
+                    self.metrics.count_request('drive.files.get', calls=len(chunk))
+            except HttpError as error:
+                print(f"⚠️  Metadata batch failed, documents will be looked up one by one: {error}")
+        
+        if batches:
+            print(f"🔎 Looked up {len(pending)} Google Docs in {batches} batch requests")
+    
+    def pull_file(self, file_path, doc_id, clean_escapes=True, manifest=None, cache=None, force=False):
+        """
+        Download a Google Doc into a local markdown file
         
-        content = self.read_markdown_file(file_path)
+        A local file edited since its last recorded push or pull, or one that
+        differs from the Google Doc and was never synced, is not overwritten
+        unless force is set.
+        """
+        print(f"📥 Pulling Google Doc {doc_id[:8]}... into {file_path}")
+        
+        entry = manifest.get(file_path) if manifest else None
+        if entry and not force and os.path.exists(file_path):
+            with self.span('hash'):
+                local_hash = file_sha256(file_path)
+            if entry.get('sha256') != local_hash:
+                print(f"⚠️  {file_path} has local changes since the last sync - use --force to overwrite")
+                return False
+        
+        content = self.export_google_doc(doc_id, cache)
         if content is None:
+            print(f"❌ Failed to pull {file_path}")
             return False
         
         # Clean escaped markdown characters if requested
         if clean_escapes:
             content = self.clean_escaped_markdown(content)
         
-        success = self.update_google_doc(doc_id, content)
-        if success:
-            print(f"✅ Successfully synced {file_path}")
+        current = self.read_markdown_file(file_path) if os.path.exists(file_path) else None
+        if current == content:
+            print(f"⏭️  Already up to date: {file_path}")
+        elif current is not None and entry is None and not force:
+            # Never synced, so there is no telling whether the local file holds edits
+            print(f"⚠️  {file_path} differs from its Google Doc and has no sync record - use --force to overwrite")
+            return False
         else:
-            print(f"❌ Failed to sync {file_path}")
+            try:
+                directory = os.path.dirname(file_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with self.span('write'):
+                    write_file_atomic(file_path, content)
+            except OSError as e:
+                print(f"❌ Error writing file {file_path}: {e}")
+                return False
+            print(f"✅ Successfully pulled {file_path}")
         
-        return success
+        if manifest:
+            # The doc now matches the file; its Docs revisionId is unknown here
+            stat = os.stat(file_path)
+            manifest.record(file_path, doc_id=doc_id, clean_escapes=clean_escapes,
+                            sha256=file_sha256(file_path), size=stat.st_size,
+                            mtime_ns=stat.st_mtime_ns, revision_id=None)
+        return True
     
-    def sync_all_files(self, config_file='sync_config.json', clean_escapes=True):
-        """Sync all files based on configuration"""
-        if not os.path.exists(config_file):
-            print(f"❌ Config file not found: {config_file}")
+    def pull_all_files(self, config_file='sync_config.json', clean_escapes=True, workers=1, force=False,
+                       base_dir=None):
+        """
+        Pull every Google Doc mapped in the config back into its local file
+        
+        Exports run concurrently like sync_all_files, and unchanged documents
+        are served from an export cache next to the config file. The Drive
+        versions that decide this are looked up in HTTP batch requests.
+        """
+        jobs = self.load_sync_jobs(config_file, base_dir)
+        if jobs is None:
             return False
         
+        config_dir = os.path.dirname(config_file)
+        manifest = SyncManifest(os.path.join(config_dir, MANIFEST_FILENAME))
+        cache = ExportCache(os.path.join(config_dir, EXPORT_CACHE_DIRNAME))
+        
+        def pull_one(file_path, doc_id):
+            return self.pull_file(file_path, doc_id, clean_escapes, manifest, cache, force)
+        
+        self.prefetch_file_metadata([doc_id for _, doc_id in jobs])
+        results = self.run_jobs(jobs, pull_one, workers)
+        self.prefetched_metadata.clear()
+        
         try:
-            with open(config_file, 'r') as f:
-                config = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON in config file: {e}")
-            return False
+            manifest.save()
+            cache.save()
+        except OSError as e:
+            print(f"⚠️  Could not save sync manifest or export cache: {e}")
         
-        success_count = 0
-        total_count = 0
+        success_count = sum(1 for success in results.values() if success)
+        total_count = len(jobs)
         
-        for file_path, doc_id in config.items():
-            # Skip configuration comments
-            if file_path.startswith('_'):
-                continue
+        print(f"\n📊 Pull complete: {success_count}/{total_count} files pulled successfully")
+        return success_count == total_count
+
+
+class SyncDaemon:
+    """
+    Long-running push loop around one authenticated GoogleDocsSync
+
+    Mapped files are polled for changes, and thin clients (`notify`) ask
+    for a sync over a local Unix socket. Any burst of saves or requests
+    restarts a debounce window and is coalesced into a single
+    sync_all_files run once the window passes quietly; every client
+    waiting on that run gets its result.
+    """
+
+    def __init__(self, sync, config_file, socket_path, debounce=DEFAULT_DEBOUNCE_SECONDS,
+                 sync_options=None):
+        self.sync = sync
+        self.config_file = config_file
+        self.socket_path = socket_path
+        self.debounce = debounce
+        self.sync_options = sync_options or {}
+        self.lock = threading.Lock()
+        self.waiters = []
+        self.pending_since = None
+        self.watched = []
+        self.config_mtime = None
+        self.mtimes = {}
+        self.server = None
+        self.stopped = threading.Event()
+
+    def snapshot(self):
+        """Return {path: (mtime_ns, size)} for the config and every mapped file"""
+        try:
+            config_mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            config_mtime = None
+        
+        if config_mtime != self.config_mtime:
+            self.config_mtime = config_mtime
+            jobs = self.sync.load_sync_jobs(self.config_file) or []
+            self.watched = [file_path for file_path, doc_id in jobs]
+        
+        mtimes = {}
+        for path in [self.config_file] + self.watched:
+            try:
+                stat = os.stat(path)
+                mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def mark_pending(self):
+        """Start or extend the debounce window"""
+        with self.lock:
+            self.pending_since = time.monotonic()
+
+    def run(self, poll_interval=DAEMON_POLL_SECONDS):
+        """Watch, serve and sync until interrupted"""
+        self.start_server()
+        self.mtimes = self.snapshot()
+        print(f"👀 Watching {len(self.watched)} files (debounce {self.debounce}s), "
+              f"listening on {self.socket_path}")
+        
+        try:
+            while not self.stopped.is_set():
+                mtimes = self.snapshot()
+                if mtimes != self.mtimes:
+                    self.mtimes = mtimes
+                    self.mark_pending()
                 
-            if doc_id == "REPLACE_WITH_GOOGLE_DOC_ID":
-                print(f"⚠️  Skipping {file_path} - no Google Doc ID configured")
-                continue
+                with self.lock:
+                    due = (self.pending_since is not None
+                           and time.monotonic() - self.pending_since >= self.debounce)
+                if due:
+                    self.run_sync()
+                
+                self.sync.refresh_credentials()
+                self.stopped.wait(poll_interval)
+        finally:
+            self.stop()
+
+    def run_sync(self):
+        """Run one sync for everything that piled up in the debounce window"""
+        with self.lock:
+            waiters, self.waiters = self.waiters, []
+            self.pending_since = None
+        
+        try:
+            success = self.sync.sync_all_files(self.config_file, **self.sync_options)
+        except Exception as e:
+            print(f"❌ Unexpected error during sync: {e}")
+            success = False
+        
+        if self.sync.metrics:
+            self.sync.metrics.report('daemon')
+        
+        for waiter in waiters:
+            waiter['success'] = success
+            waiter['done'].set()
+
+    def start_server(self):
+        """Listen on the daemon socket, replacing a stale one left by a crashed daemon"""
+        if os.path.exists(self.socket_path):
+            if notify_daemon(self.socket_path, command='ping') is not None:
+                raise RuntimeError(f"A sync daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        """Answer one client: ping, or sync and report the result"""
+        with conn:
+            try:
+                request = json.loads(conn.makefile('r').readline() or '{}')
+            except ValueError:
+                request = {}
             
-            if not os.path.exists(file_path):
-                print(f"⚠️  File not found: {file_path}")
-                continue
+            if request.get('command') == 'ping':
+                conn.sendall(b'{"success": true}\n')
+                return
             
-            total_count += 1
-            if self.sync_file(file_path, doc_id, clean_escapes):
-                success_count += 1
+            waiter = {'done': threading.Event(), 'success': False}
+            with self.lock:
+                self.waiters.append(waiter)
+            self.mark_pending()
+            waiter['done'].wait()
+            
+            try:
+                conn.sendall((json.dumps({'success': waiter['success']}) + '\n').encode())
+            except OSError:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+try:
+    # The daemon's client side lives in a small module of its own, so that
+    # watchers can run it without compiling this script
+    from sync_notify import daemon_socket_path, notify_daemon, resolve_config_path
+except ImportError:
+    # This script copied on its own (e.g. restored for a rollback) keeps
+    # working with the same helpers; keep them in step with sync_notify.py
+    DAEMON_SOCKET_FILENAME = '.sync_daemon.sock'
+    
+    def daemon_socket_path(config_file):
+        """The daemon for a config listens next to it"""
+        return os.path.join(os.path.dirname(config_file), DAEMON_SOCKET_FILENAME)
+    
+    def notify_daemon(socket_path, command='sync'):
+        """
+        Send a command to a running sync daemon and wait for its answer
         
-        print(f"\n📊 Sync complete: {success_count}/{total_count} files synced successfully")
-        return success_count == total_count
+        Returns the daemon's success flag, or None if no daemon is listening.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path)
+                client.sendall((json.dumps({'command': command}) + '\n').encode())
+                reply = client.makefile('r').readline()
+        except OSError:
+            return None
+        
+        try:
+            return bool(json.loads(reply).get('success'))
+        except ValueError:
+            return None
+    
+    def resolve_config_path(config):
+        """
+        Find the config file, starting from the script directory
+        
+        Moves to the project root when the config is found there or in
+        .claude/scripts, so mapped paths resolve as before. Returns the config
+        path relative to the new working directory, or None if not found.
+        """
+        config_path = config
+        if not os.path.exists(config_path):
+            # Try project root
+            os.chdir('../..')
+            if not os.path.exists(config_path):
+                # Try back in script directory
+                os.chdir('.claude/scripts')
+                if not os.path.exists(config_path):
+                    print(f"❌ Config file not found: {config_path}")
+                    return None
+                # Config found in script dir, but we need to be in project root for file access
+                os.chdir('../..')
+                config_path = f'.claude/scripts/{config}'
+        return config_path
 
 
 def main():
     parser = argparse.ArgumentParser(description='Sync markdown files to Google Docs')
+    parser.add_argument('command', nargs='?', choices=['push', 'pull', 'daemon', 'notify'], default='push',
+                        help='push local files to Google Docs (default), pull Google Docs into local files, '
+                             'run a watching sync daemon, or notify a running daemon to sync')
     parser.add_argument('--file', help='Specific file to sync')
     parser.add_argument('--doc-id', help='Google Doc ID (required with --file)')
     parser.add_argument('--config', default='sync_config.json', help='Config file path')
+    parser.add_argument('--directory',
+                        help='Sync every markdown file under this directory, creating Google Docs as needed')
+    parser.add_argument('--folder', default=DEFAULT_DRIVE_FOLDER_NAME,
+                        help='Google Drive folder for documents created by --directory (empty for My Drive)')
     parser.add_argument('--no-clean', action='store_true', help='Skip cleaning escaped markdown characters')
     parser.add_argument('--credentials', default='credentials.json', help='Google credentials file')
     parser.add_argument('--token', default='token.pickle', help='Token file for authentication')
+    parser.add_argument('--full-replace', action='store_true',
+                        help='Rewrite whole documents instead of applying incremental edits')
+    parser.add_argument('--force', action='store_true',
+                        help='Sync every file, overwriting remote (push) or local (pull) edits')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                        help='Seconds of quiet the daemon waits for before syncing a burst of changes')
+    parser.add_argument('--workers', type=int, default=1, help='Number of files to sync in parallel')
+    parser.add_argument('--reads-per-minute', type=int, default=DEFAULT_READ_QUOTA_PER_MINUTE,
+                        help='Docs API read quota shared by all workers')
+    parser.add_argument('--writes-per-minute', type=int, default=DEFAULT_WRITE_QUOTA_PER_MINUTE,
+                        help='Docs API write quota shared by all workers')
+    parser.add_argument('--drive-requests-per-minute', type=int, default=DEFAULT_DRIVE_QUOTA_PER_MINUTE,
+                        help='Drive API quota shared by all workers (pull and document creation)')
+    parser.add_argument('--render', action='store_true',
+                        help='Push markdown as native Docs headings, lists, bold, italic, code and links')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='Push without the cross-reference and placeholder checks enabled in .madio')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Append per-file stage timings and API counters to FILE as JSON lines')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print a per-stage timing and API call summary after syncing')
     
     args = parser.parse_args()
+    metrics_path = os.path.abspath(args.metrics) if args.metrics else None
+    directory = os.path.abspath(args.directory) if args.directory else None
     
     # Change to script directory for relative paths
-    script_dir = Path(__file__).parent
+    script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
     
+    pull = args.command == 'pull'
+    clean_escapes = not args.no_clean
+    workers = max(1, args.workers)
+    
+    def connect(create=False):
+        scopes = SCOPES + [DRIVE_READONLY_SCOPE] if pull else SCOPES
+        if create:
+            # Creating documents and folders needs access to the files it creates
+            scopes = scopes + [DRIVE_FILE_SCOPE]
+        metrics = SyncMetrics(metrics_path, args.profile) if metrics_path or args.profile else None
+        return GoogleDocsSync(args.credentials, args.token,
+                              reads_per_minute=args.reads_per_minute,
+                              writes_per_minute=args.writes_per_minute,
+                              scopes=scopes, metrics=metrics,
+                              drive_requests_per_minute=args.drive_requests_per_minute)
+    
+    def finish(sync, success):
+        if sync.metrics:
+            sync.metrics.report(args.command)
+        sys.exit(0 if success else 1)
+    
     try:
-        sync = GoogleDocsSync(args.credentials, args.token)
-        
-        if args.file:
+        if directory:
+            if args.file or args.command not in ('push', 'pull'):
+                print(f"❌ --directory cannot be used with {'--file' if args.file else args.command}")
+                sys.exit(1)
+            
+            sync = connect(create=not pull)
+            if pull:
+                success = sync.pull_all_files(os.path.join(directory, DIRECTORY_MAPPING_FILENAME),
+                                              clean_escapes, workers=workers, force=args.force,
+                                              base_dir=directory)
+            else:
+                success = sync.sync_directory(directory, args.folder, clean_escapes, workers=workers,
+                                              incremental=not args.full_replace, force=args.force,
+                                              validate=not args.no_validate, render=args.render)
+            finish(sync, success)
+        elif args.file:
+            if args.command in ('daemon', 'notify'):
+                print(f"❌ --file cannot be used with {args.command}")
+                sys.exit(1)
             if not args.doc_id:
                 print("❌ --doc-id is required when using --file")
                 sys.exit(1)
             
+            sync = connect()
+            manifest = SyncManifest(os.path.abspath(MANIFEST_FILENAME))
+            cache = ExportCache(os.path.abspath(EXPORT_CACHE_DIRNAME))
+            
             # Go back to project root for file access
             os.chdir('../..')
-            clean_escapes = not args.no_clean
-            success = sync.sync_file(args.file, args.doc_id, clean_escapes)
-            sys.exit(0 if success else 1)
+            with sync.track(args.file):
+                if pull:
+                    success = sync.pull_file(args.file, args.doc_id, clean_escapes,
+                                             manifest=manifest, cache=cache, force=args.force)
+                    cache.save()
+                else:
+                    success = sync.sync_file(args.file, args.doc_id, clean_escapes,
+                                             incremental=not args.full_replace,
+                                             manifest=manifest, force=args.force, render=args.render)
+            manifest.save()
+            finish(sync, success)
         else:
             # Handle config file path - check if it's relative to script dir or project root
-            config_path = args.config
-            if not os.path.exists(config_path):
-                # Try project root
-                os.chdir('../..')
-                if not os.path.exists(config_path):
-                    # Try back in script directory
-                    os.chdir('.claude/scripts')
-                    if not os.path.exists(config_path):
-                        print(f"❌ Config file not found: {config_path}")
-                        sys.exit(1)
-                    # Config found in script dir, but we need to be in project root for file access
-                    os.chdir('../..')
-                    config_path = f'.claude/scripts/{args.config}'
-            
-            clean_escapes = not args.no_clean
-            success = sync.sync_all_files(config_path, clean_escapes)
-            sys.exit(0 if success else 1)
+            config_path = resolve_config_path(args.config)
+            if config_path is None:
+                sys.exit(1)
+            
+            if args.command == 'notify':
+                # Thin client: hand over to a running daemon without touching Google APIs
+                success = notify_daemon(daemon_socket_path(config_path))
+                if success is not None:
+                    print("✅ Sync daemon finished" if success else "❌ Sync daemon reported failures")
+                    sys.exit(0 if success else 1)
+                print("⚠️  Sync daemon not running - syncing directly")
+            
+            sync = connect(create=not pull and has_placeholder_ids(config_path))
+            if args.command == 'daemon':
+                daemon = SyncDaemon(sync, config_path, daemon_socket_path(config_path),
+                                    debounce=args.debounce,
+                                    sync_options={'clean_escapes': clean_escapes, 'workers': workers,
+                                                  'incremental': not args.full_replace,
+                                                  'validate': not args.no_validate,
+                                                  'render': args.render})
+                daemon.run()
+                sys.exit(0)
+            
+            if pull:
+                success = sync.pull_all_files(config_path, clean_escapes, workers=workers,
+                                              force=args.force)
+            else:
+                success = sync.sync_all_files(config_path, clean_escapes, workers=workers,
+                                              incremental=not args.full_replace, force=args.force,
+                                              validate=not args.no_validate, render=args.render)
+            finish(sync, success)
             
     except KeyboardInterrupt:
         print("\n❌ Operation cancelled by user")